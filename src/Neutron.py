@@ -2,76 +2,188 @@
 #                                      Neutron Class 
 # ==========================================================================================
 
-import numpy.random as npr 
+from itertools import islice
+import numpy as np
 
 class Neutron: 
     """
         Define neutron type to allows the reactor to contain different neutron types. 
         Each neutron type will react differently with his environement and allow us to 
         simulate different reators types. 
+        The attributes are slots : thousands of neutrons are created at each step, the 
+        thermalization probabilities are shared by the reactor (see evolve).
     """
 
-    def __init__(self, id, x, y,thermalization_probs, type="fast", speed=1.0):
+    __slots__ = ("id", "x", "y", "speed", "type", "age", "generation", "is_alive")
+
+    # Speed kept at each step without moderator
+    SPEED_DECAY = 0.98
+
+    def __init__(self, id, x, y, type="fast", speed=1.0, generation=0):
+        self.reset(id, x, y, type, speed, generation)
+
+
+    # -----------------------
+    # New life of the object (see NeutronPool)
+    # ----------------------- 
+    def reset(self, id, x, y, type="fast", speed=1.0, generation=0):
         self.x = x 
         self.y = y 
         self.id = id 
         self.speed = speed 
         self.type = type    # "thermal", "fast", "epithermal"
-        
-        # Probability to change state 
-        self.thermalization_probs = thermalization_probs
-
-        # Tajectory history for plotting 
-        self.traj = [(self.x, self.y)]
 
         # Time memory 
         self.age = 0 
+        self.generation = generation    # Number of fissions since the initial neutrons
         self.is_alive = True 
 
 
     # -----------------------
     # Diffusion Behavior
     # ----------------------- 
-    def diffuse(self, max_speed): 
-        dx, dy = self.random_direction()
-        step_x = dx * npr.randint(1, max_speed + 1) * self.speed 
-        step_y = dy * npr.randint(1, max_speed + 1) * self.speed 
+    def diffuse(self, max_speed, sampler): 
+        """
+            The sampler (sampling.ActionSampler) serves the random draws from 
+            pre-generated blocks of the reactor generator. 
+        """
+        dx, dy = sampler.direction()
+        step_x = dx * sampler.step_length(max_speed) * self.speed 
+        step_y = dy * sampler.step_length(max_speed) * self.speed 
         self.x += int(step_x) 
         self.y += int(step_y) 
 
 
-    # -----------------------
-    # Direction Draw
-    # ----------------------- 
-    @staticmethod
-    def random_direction(): 
-        while True: 
-            dx = npr.choice([-1, 0, 1]) 
-            dy = npr.choice([-1, 0, 1])
-            if dx != 0 or dy != 0: 
-                return dx, dy 
-
-
     # -----------------------
     # Evolution Step 
     # ----------------------- 
-    def evolve(self, moderator=None): 
+    def evolve(self, moderator, sampler, bare): 
         """
             Update the neutron internal property over time depending on the moderator 
-            used in the reactor or just with a thermalisation prob. 
+            of its cell, or without moderator (None) with the thermalization probabilities 
+            of the bare material (materials.bare_material). 
         """
+        rand = sampler.uniform
+
         if moderator is None : 
             self.age += 1
-            self.speed *= 0.98 
-
-            if self.type == "fast" and npr.rand() < self.thermalization_probs['fast_to_epi']: 
-                self.type = "epithermal"
-
-            elif self.type == "epithermal" and npr.rand() < self.thermalization_probs['epi_to_thermal'] :
-                self.type = "thermal" 
-        
-        else: 
-            if self.type == "fast" and npr.rand() < moderator.slow_fast:
-                self.type = "epithermal"
-            elif self.type == "epithermal" and npr.rand() < moderator.slow_epi:
-                self.type = "thermal"
\ No newline at end of file
+            self.speed *= self.SPEED_DECAY 
+            moderator = bare
+
+        if self.type == "fast" and rand() < moderator.slow_fast:
+            self.type = "epithermal"
+        elif self.type == "epithermal" and rand() < moderator.slow_epi:
+            self.type = "thermal"
+
+
+class NeutronPool:
+    """
+        Neutrons of the object engine. The alive neutrons are the first size slots, 
+        the dead ones stay after them as a free list : new neutrons reuse their objects 
+        instead of allocating, and the pool is compacted in place at each step. 
+    """
+
+    def __init__(self, neutrons=None):
+        self.slots = list(neutrons or [])
+        self.size = len(self.slots)
+
+
+    def __len__(self):
+        return self.size
+
+
+    def __iter__(self):
+        return islice(self.slots, self.size)
+
+
+    # ------------------------------------------------------------------
+    # Keep the neutrons for which keep(neutron) is True, in their order
+    # ------------------------------------------------------------------
+    # The removed neutrons are swapped behind the alive ones, ready to be reused
+    def retain(self, keep):
+        slots = self.slots
+        size = 0
+        for i in range(self.size):
+            neutron = slots[i]
+            if keep(neutron):
+                if i != size:
+                    slots[i] = slots[size]
+                    slots[size] = neutron
+                size += 1
+        self.size = size
+
+
+    # ------------------------------------------------------------------
+    # Add a neutron, recycled from the free list when possible
+    # ------------------------------------------------------------------
+    def spawn(self, id, x, y, type="fast", speed=1.0, generation=0):
+        if self.size < len(self.slots):
+            neutron = self.slots[self.size]
+            neutron.reset(id, x, y, type, speed, generation)
+        else:
+            neutron = Neutron(id, x, y, type, speed, generation)
+            self.slots.append(neutron)
+        self.size += 1
+        return neutron
+
+
+class TrajectoryRecorder:
+    """
+        Optional record of the neutrons positions, off by default. Rows (step, id, x, y, 
+        type code) are written into preallocated arrays used as a ring buffer : once 
+        capacity rows are written, the oldest ones are overwritten. 
+    """
+
+    def __init__(self, capacity:int=100000):
+        self.capacity = capacity
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.xs = np.zeros(capacity, dtype=np.int64)
+        self.ys = np.zeros(capacity, dtype=np.int64)
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.written = 0        # Rows written since the start, the buffer holds the last capacity ones
+
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+
+    # ------------------------------------------------------------------
+    # Write the neutrons of a step
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - step : iteration of the rows
+    #     - ids, xs, ys, types : arrays of the neutrons (see ReactorV2.get_state_arrays)
+    def record(self, step:int, ids, xs, ys, types):
+        size = len(ids)
+        if size > self.capacity:
+            # Only the last capacity rows would be kept
+            self.written += size - self.capacity
+            ids, xs, ys, types = ids[-self.capacity:], xs[-self.capacity:], ys[-self.capacity:], types[-self.capacity:]
+            size = self.capacity
+        rows = (self.written + np.arange(size)) % self.capacity
+        self.steps[rows] = step
+        self.ids[rows] = ids
+        self.xs[rows] = xs
+        self.ys[rows] = ys
+        self.types[rows] = types
+        self.written += size
+
+
+    # ------------------------------------------------------------------
+    # Rows in the order they were written
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - steps, ids, xs, ys, types arrays
+    def rows(self):
+        order = (self.written - len(self) + np.arange(len(self))) % self.capacity
+        return self.steps[order], self.ids[order], self.xs[order], self.ys[order], self.types[order]
+
+
+    # Recorded positions of one neutron
+    # Returns:
+    #     - steps, xs, ys arrays
+    def trajectory(self, neutron_id:int):
+        steps, ids, xs, ys, _ = self.rows()
+        mask = ids == neutron_id
+        return steps[mask], xs[mask], ys[mask]
@@ -2,32 +2,60 @@
 #                                      Reactor Class (v2)
 # ==========================================================================================
 
+import json
+import math
+import os
+from functools import partial
 import numpy as np 
-import numpy.random as npr 
-from time import sleep 
-from rich.table import Table
-from rich import box 
-from rich.text import Text
-from rich.panel import Panel 
-from rich.console import Group 
-from os import system
-
-from utils import simul_poisson
-from Neutron import Neutron
-from controlRod import ControlRod
-
-class Moderator: 
+
+from utils import simul_poisson_batch, fission_histogram
+from Neutron import Neutron, NeutronPool, TrajectoryRecorder
+from controlRod import ControlRodBank
+from population import NeutronPopulation, NEUTRON_TYPES, TYPE_CODES, FAST, THERMAL, EPITHERMAL
+from history import HistoryStore, population_counts
+from stream_export import TrajectoryStreamer
+from occupancy import make_occupancy, coarse_shape
+from dashboard import LiveDashboard
+from telemetry import EventChannel
+from sampling import ActionSampler, make_rng, jumped_rng, get_rng_state, set_rng_state
+from materials import MODERATORS, bare_material, uniform_map, load_material_map
+from variance import implicit_capture, weight_window, comb
+from keff import KeffEstimator
+from profiling import PhaseProfiler, RODS, NEUTRONS, MEASURE, PILOTAGE, RECORD
+
+class RunResult: 
     """
-        Slow down neutrons depending on its efficiency.
+        Small summary of a metrics only run (see ReactorV2.run_metrics). 
     """
 
-    def __init__(self, name:str, absorb_coeff:float, diffuse_coeff:float, fission_coeff:float, slow_fast, slow_epi=0.3): 
-        self.name = name 
-        self.absorb_coeff = absorb_coeff
-        self.diffuse_coeff = diffuse_coeff
-        self.fission_coeff = fission_coeff
-        self.slow_fast = slow_fast 
-        self.slow_epi = slow_epi 
+    def __init__(self, reactor, counts:list, stop_reason:str): 
+        self.counts = np.array(counts, dtype=np.float64 if reactor.weighted else np.int64)     # Number of neutrons after each step
+        self.n_steps = len(counts)
+        self.stop_reason = stop_reason                          # 'extinction', 'keff_converged', 'predicate' or 'n_iter'
+        self.extinct = stop_reason == "extinction"
+        self.extinction_step = reactor.iteration - 1 if self.extinct else -1
+        self.power_history = np.array(reactor.power_history)
+        self.temp_history = np.array(reactor.temp_history)
+        self.fission_stat_history = reactor.fission_stat_history
+        self.scram_triggered = reactor.scram_triggered
+        self.final_power_mw = reactor.current_power_mw
+        self.final_temperature = reactor.current_temperature
+
+
+# ------------------------------------------------------------------
+# Stop predicates for ReactorV2.run_metrics
+# ------------------------------------------------------------------
+def stop_on_scram(reactor): 
+    return reactor.scram_triggered
+
+
+def power_above(reactor, power_level:float): 
+    return reactor.power_level > power_level
+
+
+def stop_above_power(power_level:float): 
+    # A partial (and not a lambda) can be sent to worker processes
+    return partial(power_above, power_level=power_level)
 
 
 class ReactorV2: 
@@ -52,17 +80,159 @@ class ReactorV2:
         self.colorized = config['colorized']
         self.thermalization_probs = config['thermalization_probs']
         self.verbose = config['verbose']
-        self.history = []
+
+        # Messages of the simulation, see telemetry.EventChannel
+        self.events = EventChannel(
+            level=config.get('log_level', 'info'),          # 'debug', 'info', 'warning', 'critical' or 'off'
+            echo=not config.get('quiet', False),            # Print the events
+            rate_limit=config.get('log_rate_limit', 0),     # Minimal number of steps between two events of a kind
+            buffer_size=config.get('log_buffer', 10000)     # Events kept for the queries after the run
+        )
+        self.iteration = 0
+
+        # Periodic checkpoints, see save_checkpoint and ReactorV2.from_checkpoint
+        self.config = config
+        self.checkpoint_every = config.get('checkpoint_every', 0)
+        self.checkpoint_path = config.get('checkpoint_path', 'statistics/checkpoint.npz')
+        self.engine = config.get('engine', 'object')     # 'object' or 'vectorized'
+
+        # 'dict' keeps one {id: (x, y, type)} per step, 'columnar' stores typed arrays
+        self.history_mode = config.get('history', 'dict')
+        if self.history_mode == 'columnar':
+            self.history = HistoryStore(
+                stride=config.get('history_stride', 1),
+                compress=config.get('history_compress', False)
+            )
+        elif self.history_mode == 'dict':
+            self.history = []
+        else:
+            raise ValueError("History not recognized. Choose between 'dict' or 'columnar'.")
+        # Dict history of a resumed run : neutrons of the steps before the restart,
+        # its first snapshot is step history_start (see from_checkpoint)
+        self.restored_counts = []
+        self.history_start = 0
+
+        # Live display, rendered on its own thread at `display_fps` frames per second
+        self.dashboard = None
+        if self.display and live is not None:
+            self.dashboard = LiveDashboard(live, self.render_frame, config.get('display_fps', 5))
+
+        # Neutrons per type and per cell, shared by the displays and the spatial statistics
+        # 'sparse' only stores the occupied cells, for very large grids
+        self.occupancy = make_occupancy(config.get('occupancy', 'dense'), self.n, self.m)
+        # Large grids are displayed as blocks of cells
+        self.display_shape = coarse_shape(self.n, self.m, config.get('display_max_cells', 40))
+
+        # Trajectories can be streamed to disk during the run, e.g. {'path': ..., 'format': 'npz'}
+        export_config = config.get('trajectory_export')
+        self.traj_streamer = TrajectoryStreamer(**export_config) if export_config else None
+        # Last positions kept in memory, e.g. {'capacity': 100000} rows (off with None)
+        recorder_config = config.get('trajectory_recorder')
+        self.traj_recorder = TrajectoryRecorder(**recorder_config) if recorder_config else None
+
+        # Opt-in timers of the step phases, see profiling.PhaseProfiler
+        self.profiler = PhaseProfiler(config['n_iter']) if config.get('profile', False) else None
+
+        # === Random generators ===
+        # Every draw comes from the generator given in the config ('rng') or seeded with 'seed'
+        # The sampler uses an independent stream, jumped ahead of the reactor one
+        self.rng = config.get('rng') or make_rng(config.get('seed'), config.get('bit_generator', 'PCG64'))
+
+        # Random draws are served by blocks, action thresholds are computed once per step
+        self.sampler = ActionSampler(jumped_rng(self.rng), config.get('random_block_size', 65536))
 
         # === Statistics ===
         self.fission_stat_history = []
 
+        # === Power, temperature and control rods ===
+        self.init_plant(config)
+
+        # === Moderator Parameters ===
+        if config['moderator'] in MODERATORS.keys(): 
+            self.moderator = MODERATORS[config['moderator']]
+        else : 
+            self.moderator = None 
+
+        # Probabilities without rods effect
+        if self.moderator:
+            self.base_a = self.moderator.absorb_coeff
+            self.base_f = self.moderator.fission_coeff
+            self.base_d = self.moderator.diffuse_coeff
+        else:
+            self.base_a = self.a
+            self.base_f = self.f
+            self.base_d = self.d        
+
+        # Material of each cell, the configuration moderator everywhere by default
+        # A map file gives a fuel/moderator/reflector layout with localized rods
+        # The bare material gives the thermalization probabilities of the cells without moderator
+        self.bare = bare_material(config)
+        map_path = config.get('material_map')
+        if map_path:
+            self.materials = load_material_map(map_path, self.n, self.m, self.bare)
+        else:
+            self.materials = uniform_map(self.n, self.m, self.moderator or self.bare)
+        self.action_table = None
+
+        # Save neutron differents states to display grid 
+        self.neutron_states = {"fast" : 0, "thermal" : 1, "epithermal" : 2}
+
+        # Init neutrons position 
+        self.init_neutrons(config)
+        self.next_id = self.n_initial
+
+        # The vectorized engine keeps the same neutrons in a structure of arrays
+        if self.engine == 'vectorized':
+            self.population = NeutronPopulation.from_neutrons(self.neutrons)
+            self.neutrons = NeutronPool()
+        elif self.engine != 'object':
+            raise ValueError("Engine not recognized. Choose between 'object' or 'vectorized'.")
+
+        # Weighted neutrons (vectorized engine) : implicit capture, weight window and a
+        # comb holding the number of simulated neutrons at population_target
+        self.population_target = config.get('population_target')
+        self.weighted = config.get('weighted', False) or bool(self.population_target)
+        # The weight window alone does not bound a supercritical population : without a
+        # target, the comb holds the initial number of neutrons
+        if self.weighted and not self.population_target:
+            self.population_target = self.n_initial
+        self.weight_bounds = config.get('weight_window', (0.25, 1.0, 4.0))   # (roulette, survival, splitting)
+        self.weight_ref = 1.0       # Weight of the neutrons after the last comb
+        if self.weighted and self.engine != 'vectorized':
+            raise ValueError("Weighted neutrons need the 'vectorized' engine.")
+
+        # Generation k-effective, e.g. {'n_inactive': 5, 'batch_size': 1, 'tolerance': 0.01}
+        # With a tolerance, the run stops once the standard error of k is below it
+        keff_config = config.get('keff')
+        self.keff = None
+        if keff_config is not None:
+            self.keff = KeffEstimator(**keff_config)
+            self.keff.record_births(self.get_generations(), self.get_weights())
+
+        """
+            We instanciate Neutrons list with only fast and epithermal neutrons with will need to 
+            slow down to produce fission reactions. 
+        """
+
+
+    # ------------------------------------------------------------------
+    # Power, temperature and control rods state
+    # ------------------------------------------------------------------
+    # Also used by surrogate.Plant, which only runs this part of the reactor
+    def init_plant(self, config:dict):
         # === Reactor parameters ===
         self.nominal_power_mw= 1400.0                       # .MW
         self.power_level = 0.0                              # Actual power in %
         self.current_power_mw = 0.0                         # Actual power in MW 
+        self.power_watts = 0.0                              # Actual power in W, heats the core
         self.current_temperature = 300.0                    # Temperature in Kelvin at t=0 (approx. 26.8°C)
         self.dt = 0.1                                       # Time step for control rod updates (seconds)
+        # The thermal and rods subsystem runs `thermal_substeps` substeps per neutron step,
+        # with 'euler' or 'exponential' (exact for a constant power) temperature updates
+        self.thermal_substeps = config.get('thermal_substeps', 1)
+        self.thermal_integrator = config.get('thermal_integrator', 'euler')
+        if self.thermal_integrator not in ('euler', 'exponential'):
+            raise ValueError("Thermal integrator not recognized. Choose between 'euler' or 'exponential'.")
         self.thermic_capacity = config["thermic_capacity"]
         self.temp_coolant = 300.0                           # Cooling water base temperature
         self.cooling_coef = self.thermic_capacity * 0.05    # Cooling water loss coefficient
@@ -79,13 +249,10 @@ class ReactorV2:
         self.rod_active = config.get('rod_active', False)
         self.rod_history = []
 
-        # Add control rods to a global list
-        self.control_rods = []
-        config_rods_list = config.get('control_rods', [])
-        for rod_config in config_rods_list:
-            self.control_rods.append(
-                ControlRod(id = rod_config['id'], type=rod_config['type'])
-            )
+        # All the rods are held by one bank, stepped together
+        # control_rods gives each rod with the ControlRod attributes
+        self.rod_bank = ControlRodBank(config.get('control_rods', []), events=self.events)
+        self.control_rods = self.rod_bank.rods
         
         self.regulation_rods = [rod for rod in self.control_rods if rod.type == 'regulation']
         self.scram_rods = [rod for rod in self.control_rods if rod.type == 'scram']
@@ -95,35 +262,18 @@ class ReactorV2:
 
         self.reg_base_position = 50.0   # Base position for regulation rods (in percent)
                                         # 100.0 = OUT - 0.0 = IN
-        self.reg_kp = 25.0              # Proportional gain for
-        self.reg_ki = 10.0              # Integral gain
+        self.reg_kp = config.get('reg_kp', 25.0)    # Proportional gain for
+        self.reg_ki = config.get('reg_ki', 10.0)    # Integral gain
         self.reg_integral_error = 0.0   # Memory of the integral error
+
+        # Hysteresis bands of the protections in MW : (activation, deactivation)
+        self.runback_band = config.get('runback_band', (700, 650))
+        self.withdraw_band = config.get('withdraw_band', (200, 250))
         
         # Sensor to move the bars in critical situations
         self.force_pull_up_active = False   # If its to hot
         self.force_pull_down_active = False # If its to cold
-        
-        # === Moderator Parameters ===
-        MODERATORS = {
-            "light_water": Moderator("light_water", absorb_coeff=1.0, diffuse_coeff=1.2, fission_coeff=0.8, slow_fast=0.3, slow_epi=0.5),
-            "graphite":   Moderator("graphite",   absorb_coeff=0.6, diffuse_coeff=1.0, fission_coeff=0.9, slow_fast=0.15, slow_epi=0.3),
-            "heavy_water": Moderator("heavy_water", absorb_coeff=0.3, diffuse_coeff=1.1, fission_coeff=1.0, slow_fast=0.25, slow_epi=0.4),
-        }
-        if config['moderator'] in MODERATORS.keys(): 
-            self.moderator = MODERATORS[config['moderator']]
-        else : 
-            self.moderator = None 
 
-        # Save neutron differents states to display grid 
-        self.neutron_states = {"fast" : 0, "thermal" : 1, "epithermal" : 2}
-
-        # Init neutrons position 
-        self.init_neutrons(config)
-
-        """
-            We instanciate Neutrons list with only fast and epithermal neutrons with will need to 
-            slow down to produce fission reactions. 
-        """
 
     # ------------------------------------------------------------------
     # Init Neutron Position
@@ -134,16 +284,16 @@ class ReactorV2:
 
         if config['initial_distribution'] == 'center':
             self.neutrons = [
-                Neutron(n, self.n // 2, self.m // 2, self.thermalization_probs, "fast") for n in range(self.n_initial)
+                Neutron(n, self.n // 2, self.m // 2, "fast") for n in range(self.n_initial)
             ]
         elif config['initial_distribution'] == 'uniform':    
             for n in range(self.n_initial):
                 # A coordinate is randomly pull from the grid
-                start_x = npr.randint(0, self.n)
-                start_y = npr.randint(0, self.m)
+                start_x = int(self.rng.integers(0, self.n))
+                start_y = int(self.rng.integers(0, self.m))
 
                 self.neutrons.append(
-                    Neutron(n, start_x, start_y, self.thermalization_probs, "fast")
+                    Neutron(n, start_x, start_y, "fast")
                 )
         elif config['initial_distribution'] == 'normal':
             """
@@ -156,78 +306,167 @@ class ReactorV2:
             std_x, std_y = 1, 1
 
             for n in range(self.n_initial):
-                raw_x = int(np.round(npr.normal(mean_x, std_x)))    # Round up to the nearest integer
-                raw_y = int(np.round(npr.normal(mean_y, std_y)))
+                raw_x = int(np.round(self.rng.normal(mean_x, std_x)))   # Round up to the nearest integer
+                raw_y = int(np.round(self.rng.normal(mean_y, std_y)))
 
                 start_x = np.clip(raw_x, 0, self.n - 1)             # Clip to be sure to be in the grid
                 start_y = np.clip(raw_y, 0, self.m - 1)
 
                 self.neutrons.append(
-                    Neutron(n, start_x, start_y, self.thermalization_probs, "fast")
+                    Neutron(n, start_x, start_y, "fast")
                 )
         else :
             raise ValueError("Initial distribution not recognized. Choose between 'center', 'uniform' or 'normal'.")
 
+        self.neutrons = NeutronPool(self.neutrons)
+
 
     # ------------------------------------------------------------------
     # Simulate a ReactorV2 process
     # ------------------------------------------------------------------
     def simulate(self): 
-        next_id = len(self.neutrons)
-        
-        # === 0. Initialization of probabilities at the first turn ===
-        if self.moderator:
-            base_a = self.moderator.absorb_coeff
-            base_f = self.moderator.fission_coeff
-            base_d = self.moderator.diffuse_coeff
+        if self.dashboard is not None:
+            self.dashboard.start()
+
+        try:
+            # Starts after the last step of a restored checkpoint
+            for iteration in range(self.iteration, self.n_iter):
+                self.step()
+
+                # === 6. History and display ===
+                self.record_step(iteration)
+                if self.profiler is not None:
+                    self.profiler.lap(RECORD)
+
+                if self.checkpoint_every and (iteration + 1) % self.checkpoint_every == 0:
+                    self.save_checkpoint(self.checkpoint_path)
+
+                if self.keff is not None and self.keff.converged():
+                    self.events.emit("keff.converged", "k-eff converged : %.5f +/- %.5f", self.keff.mean(), self.keff.std_error())
+                    break
+        finally:
+            if self.dashboard is not None:
+                self.dashboard.stop()
+
+        if self.traj_streamer is not None:
+            self.traj_streamer.close()
+        if self.profiler is not None:
+            self.events.emit("profile.summary", "%s", self.profiler.format_summary())
+        return self.history
+
+
+    # ------------------------------------------------------------------
+    # Metrics only run : no snapshot, no display and no print
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - stop_when : optional predicate stop_when(reactor) checked after each step,
+    #                   e.g. stop_on_scram or stop_above_power(1.2)
+    # Returns:
+    #     - RunResult, the run also stops when all neutrons have disappeared
+    #       or when the k-effective has converged
+    def run_metrics(self, stop_when=None):
+        self.events.echo = False
+        counts = []
+        stop_reason = "n_iter"
+
+        for _ in range(self.iteration, self.n_iter):
+            self.step()
+            self.fission_stat_history.append(self.fission_stat_step)
+            counts.append(self.estimated_neutrons())
+            if self.profiler is not None:
+                self.profiler.lap(RECORD)
+
+            if counts[-1] == 0:
+                stop_reason = "extinction"
+                break
+            if self.keff is not None and self.keff.converged():
+                stop_reason = "keff_converged"
+                break
+            if stop_when is not None and stop_when(self):
+                stop_reason = "predicate"
+                break
+
+        return RunResult(self, counts, stop_reason)
+
+
+    # ------------------------------------------------------------------
+    # Advance the reactor of one time step
+    # ------------------------------------------------------------------
+    def step(self): 
+        # === 1. Reset the counters ===
+        self.n_fissions = 0
+        self.iteration += 1
+        self.events.step = self.iteration
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start_step(self.iteration, self.estimated_neutrons())
+
+        # === 2. Calculate rods effects on the previous turn ===
+        # 1 pcm = 1e-5 delta k/k
+        # if rho_rods_pcm is negative, it means we have less fission reactions
+        rod_pcm = {}
+        rods_pcm = 0.0
+        if self.rod_active:
+            reactivities = self.rod_bank.reactivity_pcm().tolist()
+            rod_pcm = dict(zip(self.rod_bank.ids, reactivities))
+            rods_pcm = sum(reactivities)
+
+        # Actualisation of the probabilities of every zone of the material map
+        # Rod have not effect on diffus_coef
+        self.action_table = self.materials.action_table(rod_pcm)
+        if self.materials.uniform:
+            # Single zone : the object engine uses the scalar thresholds
+            rho_rods_abs = rods_pcm / 1e5
+            reactivity_factor = max(1.0 + rho_rods_abs, 0.0)
+            current_f = self.base_f * reactivity_factor
+            current_a = self.base_a + (self.base_f - current_f)     # To keep the same ratio between a and f
+            self.sampler.set_probabilities(current_a, current_f, self.base_a, self.base_d)
+        elif self.engine == 'object':
+            self.action_rows = self.action_table.tolist()
+        if profiler is not None:
+            profiler.lap(RODS)
+
+        # === 3. Simulate neutrons with new probabilities ===
+        if self.engine == 'vectorized':
+            self.next_id = self.update_population(self.next_id)
         else:
-            base_a = self.a
-            base_f = self.f
-            base_d = self.d        
-
-        for _ in range(self.n_iter):
-            # Initializing the dictionary containing the distribution of the number of neutrons created by fission at each time
-            self.fission_stat_step = {
-                2 : 0,
-                3 : 0,
-                4 : 0,
-                5 : 0
-            }
-
-            # === 1. Reset the counters ===
-            self.n_fissions = 0
-
-            # === 2. Calculate rods effects on the previous turn ===
-            if self.rod_active:
-                # 1 pcm = 1e-5 delta k/k
-                # if rho_rods_pcm is negative, it means we have less fission reactions
-                rho_rods_pcm = sum(rod.get_reactivity_pcm() for rod in self.control_rods)
-                rho_rods_abs = rho_rods_pcm / 1e5
-                reactivity_factor = 1.0 + rho_rods_abs
-                if reactivity_factor < 0.0 : 
-                    reactivity_factor = 0.0
-            else:
-                reactivity_factor = 1.0
-
-            # Actualisation of the probabilities
-            # Rod have not effect on diffus_coef
-            current_f = base_f * reactivity_factor
-            current_a = base_a + (base_f - current_f)   # To keep the same ratio between a and f
-
-            # === 3. Simulate neutrons with new probabilities ===
-            new_neutrons = []
-            alive_neutrons = []
-
-            for neutron in self.neutrons: 
-                next_id, new_neutrons, alive_neutrons = self.update_neutron(neutron, next_id, new_neutrons, alive_neutrons, base_a, current_a, current_f, base_d)
-
-            # Update population
-            new_neutrons.extend(alive_neutrons)
-            self.neutrons = new_neutrons
-
-            # === 4. Physical measurement ===
-            # We calculate : P(MW), P(%), T(K)
-            self.update_temperature_and_power_level()
+            fission_sites = []
+
+            # The pool is compacted in place, absorbed and leaked neutrons are recycled
+            self.neutrons.retain(partial(self.update_neutron, fission_sites=fission_sites))
+
+            # Update population, fission neutrons are created all together
+            self.next_id = self.create_fission_neutrons(fission_sites, self.next_id)
+
+        # Generations without alive neutrons give their k
+        if self.keff is not None:
+            self.keff.update(self.get_generations())
+        if profiler is not None:
+            profiler.lap(NEUTRONS)
+
+        # === 4. and 5. Thermal state and rods pilotage ===
+        self.advance_plant()
+        if profiler is not None:
+            profiler.end_step(self.n_fissions)
+
+
+    # ------------------------------------------------------------------
+    # Deterministic part of a step : power, temperature and rods
+    # ------------------------------------------------------------------
+    # The power of the step comes from self.n_fissions, then the temperature and
+    # the rods are integrated over dt with thermal_substeps substeps
+    def advance_plant(self): 
+        profiler = self.profiler
+
+        # === 4. Physical measurement ===
+        # We calculate : P(MW), P(%), T(K)
+        self.update_power_level()
+        substep = self.dt / self.thermal_substeps
+
+        for _ in range(self.thermal_substeps):
+            self.update_temperature(substep)
+            if profiler is not None:
+                profiler.lap(MEASURE)
 
             # === 5. Rods pilotage ===
             if self.rod_active:
@@ -235,150 +474,341 @@ class ReactorV2:
                 self.check_emergency_scram()
 
                 # Launch automatic pilote
-                self.update_automatic_control_rods()
+                self.update_automatic_control_rods(substep)
 
                 # Move the bars accordingly
                 # Their new position will be taken into account in the next round
-                for rod in self.control_rods:
-                    rod.step(self.dt)
-            
-            # === 6. History and display ===
-            state_snapshot = {n.id : (n.x,n.y,n.type) for n in self.neutrons}
-            self.history.append(state_snapshot)
+                self.rod_bank.step(substep)
+            if profiler is not None:
+                profiler.lap(PILOTAGE)
 
-            # Update fission stat
-            self.fission_stat_history.append(self.fission_stat_step)
+        self.temp_history.append(self.current_temperature)
+
+
+    # ------------------------------------------------------------------
+    # Replay a recorded fission series without neutrons
+    # ------------------------------------------------------------------
+    # Only the thermal and rods subsystem runs, e.g. to tune reg_kp, reg_ki and the
+    # hysteresis bands on the fissions of a stochastic run (see fissions_from_power).
+    # The reactor can be built with n_initial = 0.
+    # Input:
+    #     - fission_counts : number of fissions of each step
+    # Returns:
+    #     - power (MW) and temperature (K) histories, as arrays
+    def replay(self, fission_counts): 
+        for n_fissions in fission_counts:
+            self.iteration += 1
+            self.events.step = self.iteration
+            if self.profiler is not None:
+                self.profiler.start_step(self.iteration, 0)
+            self.n_fissions = n_fissions
+            self.advance_plant()
+            if self.profiler is not None:
+                self.profiler.end_step(n_fissions)
+            self.rod_history.append({rod.id : rod.position_percent for rod in self.control_rods})
+        return np.array(self.power_history), np.array(self.temp_history)
+
+
+    # Number of fissions of each step of a power history (MW)
+    def fissions_from_power(self, power_mw):
+        return np.asarray(power_mw) * 1e6 * self.dt / (self.fission_energy * self.power_scaling_factor)
+
+
+    # ------------------------------------------------------------------
+    # Save the step in the history and display it
+    # ------------------------------------------------------------------
+    def record_step(self, iteration:int): 
+        ids, xs, ys, types = self.get_state_arrays()
+        self.occupancy.update(xs, ys, types)
+
+        if self.history_mode == 'columnar':
+            self.history.append(ids, xs, ys, types)
+        else:
+            self.history.append(self.get_snapshot())
+
+        if self.traj_streamer is not None:
+            self.traj_streamer.write(iteration, ids, xs, ys, types)
+        if self.traj_recorder is not None:
+            self.traj_recorder.record(iteration, ids, xs, ys, types)
+
+        # Update fission stat
+        self.fission_stat_history.append(self.fission_stat_step)
+
+        # Rod position history
+        current_rod_positions = {}
+        for rod in self.control_rods:
+            current_rod_positions[rod.id] = rod.position_percent                
+        
+        self.rod_history.append(current_rod_positions)
+
+        # Display, the dashboard renders the latest frame at its own pace
+        if self.dashboard is not None: 
+            self.dashboard.publish(self.build_frame())
+        
+        if self.verbose: 
+            self.events.emit("run.progress", "Iteration : %d / %d - Nb of neutrons : %d", iteration + 1, self.n_iter, self.count_neutrons())
 
-            # Rod position history
-            current_rod_positions = {}
-            for rod in self.control_rods:
-                current_rod_positions[rod.id] = rod.position_percent                
-                print(f"Rod {rod.id} moved to {rod.position_percent:.2f}% (Target: {rod.target_position:.2f})")
-            
-            self.rod_history.append(current_rod_positions)
-
-            # Display
-            if self.display == True: 
-                if self.colorized:
-                    self.display_reactor_colorized()
-                else:
-                    self.display_reactor()
-            
-            if self.verbose: 
-                system('clear')
-                print("=========== Running Class II Reactor ===========")
-                print(f"Iteration : {len(self.history)} / {self.n_iter}")
-                print(f"Nb of neutrons : {len(self.neutrons)}")
-        return self.history
-    
 
     # ------------------------------------------------------------------
     # Update neutron position/state at each iteration
-    # current_a & current_f are the new probabilities
+    # The probabilities of the step are held by self.sampler
+    # Fission positions are stored in fission_sites, new neutrons are created
+    # afterwards by create_fission_neutrons
+    # Returns True if the neutron is still alive and in the grid
     # ------------------------------------------------------------------
-    def update_neutron(self, neutron:Neutron, next_id:int, new_neutrons:list, alive_neutrons:bool, base_a:float, current_a:float, current_f:float, base_d:float):
+    def update_neutron(self, neutron:Neutron, fission_sites:list):
         # === 1. Check if neutron is alive ===
         if not neutron.is_alive: 
-            return next_id, new_neutrons, alive_neutrons
+            return False
         
         """
             Neutron react only if it's a thermal one. 
             In the other cases, it diffuse or it's absobrd by the reactor.
         """
 
-        # === 2. Choose action based on his type ===
-        if neutron.type == "thermal": 
+        # === 2. Choose action based on his type (and on his cell with a material map) ===
+        if not self.materials.uniform:
+            action = self.choose_action_local(neutron)
+        elif neutron.type == "thermal": 
             # Choose an action for a thermak one
-            action = self.choose_action_thermal(current_a, current_f, base_d)
-
-            if action == 0: 
-                # Diffusion 
-                neutron.diffuse(self.max_speed)
-            elif action == 1: 
-                # Absorption 
-                neutron.is_alive = False 
-                return next_id, new_neutrons, alive_neutrons 
-            else :
-                n_new = simul_poisson(self.l)
-
-                # Update number of fission
-                if n_new in self.fission_stat_step:
-                    self.fission_stat_step[n_new] += 1
-                elif n_new == 5:
-                    self.fission_stat_step[5] += 1
-                else:
-                    self.fission_stat_step[2] += 1
-                
-                # We create n_new neutrons accordingly with the fish law
-                for _ in range(n_new): 
-                    new_neutrons.append(
-                        Neutron(next_id, neutron.x, neutron.y, self.thermalization_probs, type='fast', speed=1.0)
-                    )
-                    next_id += 1
+            action = self.choose_action_thermal()
         else : 
-            action = self.choose_action_other(base_a, base_d)
-            if action == 0: 
-                # Diffusion 
-                neutron.diffuse(self.max_speed)
-            elif action == 1: 
-                # Absorption 
-                neutron.is_alive = False 
-                return next_id, new_neutrons, alive_neutrons 
-
-        # === 3. Update internal neutron state ===
-        neutron.evolve(self.moderator)
+            action = self.choose_action_other()
+
+        if action == 0: 
+            # Diffusion 
+            neutron.diffuse(self.max_speed, self.sampler)
+        elif action == 1: 
+            # Absorption 
+            neutron.is_alive = False 
+            return False 
+        else :
+            # Fission (thermal neutrons only), new neutrons will be born on this cell
+            fission_sites.append((neutron.x, neutron.y, neutron.generation))
 
         # Applic toric 
         if self.toric: 
             neutron.x %= self.n 
             neutron.y %= self.m
+
+        # === 3. Update internal neutron state with the moderator of its new cell ===
+        if self.materials.uniform:
+            neutron.evolve(self.moderator, self.sampler, self.bare)
+        else:
+            neutron.evolve(self.materials.moderator_at(neutron.x, neutron.y), self.sampler, self.bare)
         
         # === 4. Test if neutron is in the grid ===
-        if self.is_in_the_grid(neutron.x, neutron.y): 
-            alive_neutrons.append(neutron)
-        
-        return next_id, new_neutrons, alive_neutrons
+        return self.is_in_the_grid(neutron.x, neutron.y)
+
+
+    # ------------------------------------------------------------------
+    # Create the neutrons produced by all the fissions of a step
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - fission_sites : list of (x, y, generation) of the fissions
+    #     - next_id : first free neutron id
+    # The new fast neutrons are added to the pool, after the alive ones
+    # Returns:
+    #     - next_id : next free neutron id
+    def create_fission_neutrons(self, fission_sites:list, next_id:int):
+        # One draw for all the fissions of the step, accordingly with the fish law
+        n_new = simul_poisson_batch(self.l, len(fission_sites), self.rng)
+        self.fission_stat_step = fission_histogram(n_new)
+
+        spawn = self.neutrons.spawn
+        for (x, y, generation), nb in zip(fission_sites, n_new.tolist()): 
+            for _ in range(nb): 
+                spawn(next_id, x, y, 'fast', 1.0, generation + 1)
+                next_id += 1
+
+        if self.keff is not None:
+            generations = np.array([site[2] for site in fission_sites], dtype=np.int64)
+            self.keff.record_births(np.repeat(generations + 1, n_new))
+        return next_id
+
+
+    # ------------------------------------------------------------------
+    # Update the whole population at once (vectorized engine)
+    # Same rules as update_neutron, applied with masks on the population arrays
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - next_id : next free neutron id
+    def update_population(self, next_id:int):
+        pop = self.population
+        pop.keep(pop.is_alive)
+
+        # === 1. Choose an action for every neutron ===
+        # 0 for diffusion, 1 for absorption, 2 for fission
+        # The thresholds are gathered by (type, zone of the cell) from the material map
+        zone = self.materials.zone_of(pop.x, pop.y)
+        thresholds = self.action_table[(pop.type == THERMAL).view(np.uint8), zone]
+        if self.weighted:
+            # Implicit capture : the weight takes the absorption, only diffusion and fission are drawn
+            survival, thresholds = implicit_capture(thresholds)
+            pop.weight *= survival
+        action = self.sampler.actions_at(thresholds)
+
+        # === 2. Fission : children are created on their parent cell ===
+        # Weighted tallies : a fission counts for the weight of its neutron
+        fission = np.flatnonzero(action == 2)
+        n_new = simul_poisson_batch(self.l, len(fission), self.rng)
+        if self.weighted:
+            self.n_fissions += float(pop.weight[fission].sum())
+            self.fission_stat_step = fission_histogram(n_new, pop.weight[fission])
+        else:
+            self.n_fissions += len(fission)
+            self.fission_stat_step = fission_histogram(n_new)
+        children = pop.offspring(fission, n_new, next_id)
+        next_id += len(children)
+        if self.keff is not None:
+            self.keff.record_births(children.generation, children.weight if self.weighted else None)
+
+        # === 3. Diffusion ===
+        diffuse = np.flatnonzero(action == 0)
+        dx, dy = self.sampler.directions(len(diffuse))
+        speed = pop.speed[diffuse]
+        pop.x[diffuse] += (dx * self.sampler.step_lengths(self.max_speed, len(diffuse)) * speed).astype(np.int64)
+        pop.y[diffuse] += (dy * self.sampler.step_lengths(self.max_speed, len(diffuse)) * speed).astype(np.int64)
+
+        # === 4. Absorption ===
+        pop.keep(action != 1)
+
+        # Applic toric 
+        if self.toric: 
+            pop.x %= self.n 
+            pop.y %= self.m
+
+        # === 5. Update internal neutrons state with the material of their new cell ===
+        zone = self.materials.zone_of(pop.x, pop.y)
+        ages = self.materials.ages[zone]
+        pop.age[ages] += 1
+        pop.speed[ages] *= 0.98
+        u = self.sampler.uniforms(len(pop))
+        slow_down = u < self.materials.slow[pop.type, zone]
+        to_epi = slow_down & (pop.type == FAST)
+        to_thermal = slow_down & (pop.type == EPITHERMAL)
+        pop.type[to_epi] = EPITHERMAL
+        pop.type[to_thermal] = THERMAL
+
+        # === 6. Keep neutrons inside the grid, new ones first ===
+        pop.keep((pop.x >= 0) & (pop.x < self.n) & (pop.y >= 0) & (pop.y < self.m))
+        pop.prepend(children)
+
+        # === 7. Population control of the weighted neutrons ===
+        if self.weighted:
+            next_id = self.control_population(next_id)
+        return next_id
+
+
+    # ------------------------------------------------------------------
+    # Keep the weights in their window and the population near its target
+    # ------------------------------------------------------------------
+    # The simulated population stays bounded whatever the reactivity,
+    # the weights carry the physical population
+    # Returns:
+    #     - next_id : next free neutron id
+    def control_population(self, next_id:int):
+        low, survive, high = self.weight_bounds
+        next_id = weight_window(self.population, self.rng, next_id, self.weight_ref, low, survive, high)
+        if self.population_target:
+            next_id, weight = comb(self.population, self.population_target, self.rng, next_id)
+            if weight > 0.0:
+                self.weight_ref = weight
+        return next_id
+
+
+    # ------------------------------------------------------------------
+    # Current neutrons state, whatever the engine
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - dictionary {id: (x, y, type)}
+    def get_snapshot(self):
+        if self.engine == 'vectorized':
+            return self.population.snapshot()
+        return {n.id : (n.x,n.y,n.type) for n in self.neutrons}
+
+
+    # ------------------------------------------------------------------
+    # Current neutrons state as arrays, whatever the engine
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - ids, xs, ys, types : types are codes of population.NEUTRON_TYPES
+    def get_state_arrays(self):
+        if self.engine == 'vectorized':
+            pop = self.population
+            return pop.id, pop.x, pop.y, pop.type
+        size = len(self.neutrons)
+        return (
+            np.fromiter((n.id for n in self.neutrons), dtype=np.int64, count=size),
+            np.fromiter((n.x for n in self.neutrons), dtype=np.int64, count=size),
+            np.fromiter((n.y for n in self.neutrons), dtype=np.int64, count=size),
+            np.fromiter((TYPE_CODES[n.type] for n in self.neutrons), dtype=np.uint8, count=size)
+        )
+
+
+    # Generation and weight of each neutron, whatever the engine
+    def get_generations(self):
+        if self.engine == 'vectorized':
+            return self.population.generation
+        return np.fromiter((n.generation for n in self.neutrons), dtype=np.int64, count=len(self.neutrons))
+
+
+    def get_weights(self):
+        if self.weighted:
+            return self.population.weight
+        return None
+
+
+    # Number of neutrons of every recorded step, including the steps before a restart
+    def get_population_counts(self):
+        return self.restored_counts + population_counts(self.history)
+
+
+    def count_neutrons(self):
+        if self.engine == 'vectorized':
+            return len(self.population)
+        return len(self.neutrons)
+
+
+    # Physical number of neutrons : sum of the weights in the weighted mode
+    def estimated_neutrons(self):
+        if self.weighted:
+            return float(self.population.weight.sum())
+        return self.count_neutrons()
 
 
     # ------------------------------------------------------------------
     # Choose which action to perform for a neutron at each iteration
     # Rods are only useful against thermal neutrons
     # For other types, the probabilities of fission and absorption remain unchanged
+    # The thresholds are computed once per step by self.sampler.set_probabilities
     # ------------------------------------------------------------------
-    # Inputs: 
-    #     - current_a : absorption probability
-    #     - current_f : fission probability
-    #     - base_a : base absorption probability for no thermal
-    #     - base_d : diffusion probability
     # Returns:
     #     - 0 for diffusion, 1 for absorption, 2 for fission
-    def choose_action_thermal(self, current_a:float, current_f:float, base_d:float):
+    def choose_action_thermal(self):
         """
             Choose an action to perform depending on the moderator used. 
         """
 
-        total = current_a + current_f + base_d
-        d1 = base_d/total
-        a1 = current_a/total
-        u = npr.rand()
-        if u < d1:
-            # Diffuse
-            return 0
-        elif u < a1 + d1:
-            # Absorb
-            return 1
-        # Fission
-        self.n_fissions += 1
-        return 2
-
-
-    def choose_action_other(self, base_a:float, base_d:float):
-        total = base_a + base_d
-        d1 = base_d/total
-        u = npr.rand()
-        if u < d1:
-            return 0
-        return 1
+        action = self.sampler.thermal_action()
+        if action == 2:
+            # Fission
+            self.n_fissions += 1
+        return action
+
+
+    def choose_action_other(self):
+        return self.sampler.other_action()
+
+
+    # Thresholds of the neutron zone (heterogeneous material map)
+    def choose_action_local(self, neutron:Neutron):
+        zone = self.materials.zone_at(neutron.x, neutron.y)
+        threshold_d, threshold_a = self.action_rows[neutron.type == "thermal"][zone]
+        action = self.sampler.action_between(threshold_d, threshold_a)
+        if action == 2:
+            self.n_fissions += 1
+        return action
 
     
     # ------------------------------------------------------------------
@@ -392,14 +822,8 @@ class ReactorV2:
 
     # ------------------------------------------------------------------
     # Calculate current reactor power in MW & %
-    # Calculate current reactor temperature of the reactor
     # ------------------------------------------------------------------
-    def update_temperature_and_power_level(self):
-        """
-            Updates power (MW), power level (%), and temperature (K)
-            Uses Newton's Law of Cooling
-        """
-
+    def update_power_level(self):
         # === 1. Calculate generated power (MW) ===
         # (Energie totale) / (Temps)
         energy_joules_per_step = self.n_fissions * self.fission_energy          # .Joules
@@ -407,6 +831,7 @@ class ReactorV2:
         power_watts_generated = (power_watts_micro) * self.power_scaling_factor
 
         self.current_power_mw = power_watts_generated / 1e6                     # Conversion between W -> MW
+        self.power_watts = power_watts_generated
         self.power_history.append(self.current_power_mw)
 
         # === 2. Update power level(%) for the regulator rod ===
@@ -415,6 +840,19 @@ class ReactorV2:
         else:
             self.power_level = 0.0
 
+
+    # ------------------------------------------------------------------
+    # Integrate the temperature over dt, at the power of the step
+    # ------------------------------------------------------------------
+    def update_temperature(self, dt:float):
+        if self.thermal_integrator == 'exponential':
+            # Exact solution of C dT/dt = P - h (T - T_eau) for a constant power :
+            # exponential relaxation towards the equilibrium temperature
+            temp_equilibrium = self.temp_coolant + self.power_watts / self.cooling_coef
+            decay = math.exp(-self.cooling_coef * dt / self.thermic_capacity)
+            self.current_temperature = temp_equilibrium + (self.current_temperature - temp_equilibrium) * decay
+            return
+
         # === 3. Calculate cooling power (P_out) ===
         # P_out = h * (T_reacteur - T_eau)
         delta_T = self.current_temperature - self.temp_coolant
@@ -423,40 +861,210 @@ class ReactorV2:
         # === 4. Temperature variation ===
         # P_net = P_in - P_out
         # dT = (P_net / C) * dt
-        power_net_watts = power_watts_generated - power_watts_cooling
-        dT_per_step = (power_net_watts / self.thermic_capacity) * self.dt
+        power_net_watts = self.power_watts - power_watts_cooling
+        dT_per_step = (power_net_watts / self.thermic_capacity) * dt
 
         self.current_temperature += dT_per_step
-        self.temp_history.append(self.current_temperature)
+
+
+    # ------------------------------------------------------------------
+    # Save the whole reactor state in a compressed binary file
+    # ------------------------------------------------------------------
+    def save_checkpoint(self, path:str): 
+        # === 1. Neutrons ===
+        ids, xs, ys, types = self.get_state_arrays()
+        if self.engine == 'vectorized':
+            speeds, ages, weights = self.population.speed, self.population.age, self.population.weight
+        else:
+            speeds = np.array([n.speed for n in self.neutrons], dtype=np.float64)
+            ages = np.array([n.age for n in self.neutrons], dtype=np.int64)
+            weights = np.ones(len(self.neutrons))
+        generations = self.get_generations()
+
+        # === 2. Scalars : control, thermal state and RNG ===
+        state = {
+            "config" : self.config,
+            "iteration" : self.iteration,
+            "next_id" : self.next_id,
+            "power_level" : self.power_level,
+            "current_power_mw" : self.current_power_mw,
+            "current_temperature" : self.current_temperature,
+            "n_fissions" : self.n_fissions,
+            "reg_integral_error" : self.reg_integral_error,
+            "force_pull_up_active" : self.force_pull_up_active,
+            "force_pull_down_active" : self.force_pull_down_active,
+            "scram_triggered" : self.scram_triggered,
+            "weight_ref" : self.weight_ref,
+            "keff" : self.keff.state() if self.keff is not None else None,
+            "rods" : {rod.id : (rod.position_percent, rod.target_position) for rod in self.control_rods},
+            "power_history" : self.power_history,
+            "temp_history" : self.temp_history,
+            "fission_stat_history" : self.fission_stat_history,
+            "rod_history" : self.rod_history,
+            "counts" : self.get_population_counts(),
+            # Rows already on disk, the export goes on from them after a restart
+            "trajectory_export" : self.traj_streamer.sync() if self.traj_streamer is not None else None,
+            "rng" : get_rng_state(self.rng),
+            "sampler_rng" : get_rng_state(self.sampler.block.rng),
+            "sampler_pos" : self.sampler.block.pos
+        }
+
+        # === 3. Write, the previous checkpoint is replaced only once the new one is complete ===
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f, state=np.array(json.dumps(state, default=str)),
+                ids=ids, xs=xs, ys=ys, types=types, speeds=speeds, ages=ages, weights=weights, generations=generations,
+                sampler_buffer=self.sampler.block.buffer
+            )
+        os.replace(tmp_path, path)
+        self.events.emit("checkpoint.saved", "Checkpoint saved to %s", path)
+
+
+    # ------------------------------------------------------------------
+    # Replace the random generators, e.g. to fork replicas from a checkpoint
+    # ------------------------------------------------------------------
+    def set_rng(self, rng): 
+        self.rng = rng
+        self.sampler.block.rng = jumped_rng(rng)
+        self.sampler.block.refill()
+
+
+    # ------------------------------------------------------------------
+    # Rebuild a reactor from a checkpoint
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - path : file written by save_checkpoint
+    #     - live : rich Live object for the display (optional)
+    #     - config_overrides : configuration keys to change, e.g. {'n_iter': 5000}
+    @classmethod
+    def from_checkpoint(cls, path:str, live=None, config_overrides:dict=None): 
+        with np.load(path) as data:
+            arrays = {name : data[name] for name in data.files}
+        state = json.loads(str(arrays["state"]))
+        config = dict(state["config"], **(config_overrides or {}))
+        block_size = len(arrays["sampler_buffer"])
+        if config.get('random_block_size', block_size) != block_size:
+            raise ValueError(f"A resumed run keeps the random block size of its checkpoint ({block_size}), 'random_block_size' cannot be overridden.")
+        # The generators are restored below, no need to seed them
+        reactor = cls(live, dict(config, rng=None, seed=None))
+        reactor.config = config
+
+        # === 1. Neutrons ===
+        if reactor.engine == 'vectorized':
+            reactor.population = NeutronPopulation(arrays["ids"], arrays["xs"], arrays["ys"], arrays["types"], arrays["speeds"], arrays["ages"], arrays.get("weights"), arrays.get("generations"))
+        else:
+            reactor.neutrons = NeutronPool([
+                Neutron(i, x, y, type=NEUTRON_TYPES[t], speed=speed)
+                for i, x, y, t, speed in zip(arrays["ids"].tolist(), arrays["xs"].tolist(), arrays["ys"].tolist(), arrays["types"].tolist(), arrays["speeds"].tolist())
+            ])
+            generations = arrays["generations"].tolist() if "generations" in arrays else [0] * len(reactor.neutrons)
+            for neutron, age, generation in zip(reactor.neutrons, arrays["ages"].tolist(), generations):
+                neutron.age = age
+                neutron.generation = generation
+
+        # === 2. Control and thermal state ===
+        for name in ("iteration", "next_id", "power_level", "current_power_mw", "current_temperature", "n_fissions",
+                     "reg_integral_error", "force_pull_up_active", "force_pull_down_active", "scram_triggered",
+                     "weight_ref", "power_history", "temp_history", "rod_history"):
+            setattr(reactor, name, state[name])
+        if reactor.keff is not None and state.get("keff") is not None:
+            reactor.keff.restore(state["keff"])
+        reactor.fission_stat_history = [{int(nb) : count for nb, count in stats.items()} for stats in state["fission_stat_history"]]
+
+        # The snapshots are not saved, only the neutrons of each step : the columnar
+        # history keeps them as steps without snapshot, the dict history aside
+        counts = state.get("counts", [])
+        if reactor.history_mode == 'columnar':
+            reactor.history.counts = list(counts)
+            reactor.history.n_steps = len(counts)
+        else:
+            reactor.restored_counts = list(counts)
+            reactor.history_start = len(counts)
+
+        # The streamed trajectories continue the files of the run (same path only)
+        export_state = state.get("trajectory_export")
+        if reactor.traj_streamer is not None and export_state is not None and export_state["path"] == reactor.traj_streamer.path and export_state["format"] == reactor.traj_streamer.format:
+            reactor.traj_streamer.restore(export_state)
+        for rod in reactor.control_rods:
+            rod.position_percent, rod.target_position = state["rods"][rod.id]
+        if reactor.scram_triggered:
+            reactor.regulation_rods = None
+        reactor.events.step = reactor.iteration
+
+        # === 3. Random state ===
+        set_rng_state(reactor.rng, state["rng"])
+        set_rng_state(reactor.sampler.block.rng, state["sampler_rng"])
+        # The saved block is served up to its end : its size is the one of the run
+        reactor.sampler.block.buffer = arrays["sampler_buffer"]
+        reactor.sampler.block.block_size = len(arrays["sampler_buffer"])
+        reactor.sampler.block.pos = state["sampler_pos"]
+        return reactor
+
+
+    # ------------------------------------------------------------------
+    # Copy of the reactor state needed by the displays
+    # The frame is rendered by the dashboard thread while the simulation goes on
+    # ------------------------------------------------------------------
+    def build_frame(self): 
+        # Rods infos
+        if self.rod_active:
+            rod_depth = "N/A"
+            if self.regulation_rods:
+                rod_depth = f"{100.0 - self.regulation_rods[0].position_percent:.2f}%" 
+        else:
+            rod_depth = "--SYSTEM OFF--"
+
+        return {
+            "counts" : self.occupancy.coarse_counts(self.display_shape),
+            "dominant" : self.occupancy.coarse_dominant(self.display_shape),
+            "neutrons" : self.count_neutrons(),
+            "power" : self.power_history[-1],
+            "temperature" : self.temp_history[-1],
+            "rod_depth" : rod_depth,
+            "scram_triggered" : self.scram_triggered
+        }
+
+
+    def render_frame(self, frame:dict): 
+        if self.colorized:
+            return self.display_reactor_colorized(frame)
+        return self.display_reactor(frame)
 
 
     # ------------------------------------------------------------------
     # Display Reactor State
     # ------------------------------------------------------------------ 
-    def display_reactor(self): 
-        # === 1. Build grid ===
-        grid = np.zeros((self.n, self.m))
-        for neutron in self.neutrons: 
-            if neutron.is_alive: 
-                grid[neutron.x, neutron.y] += 1
+    def display_reactor(self, frame:dict): 
+        # rich is only imported when the reactor is displayed
+        from rich.table import Table
+
+        # === 1. Read grid ===
+        grid = frame["counts"]
         
         # === 2. Create the table to Live ===
         table = Table(show_header=False, show_lines=True)
-        for line in grid:
-            table.add_row(*[str(int(x)) if x > 0 else ' ' for x in line])
-        self.live.update(table)
-        sleep(0.2)
+        for line in grid.tolist():
+            table.add_row(*[str(x) if x > 0 else ' ' for x in line])
+        return table
     
   
     # ------------------------------------------------------------------
     # Display Reactor State with colors 
     # ------------------------------------------------------------------
-    def display_reactor_colorized(self): 
-        grid = [[{"fast" : 0, "thermal" : 0, "epithermal" : 0} for _ in range(self.n)] for _ in range(self.m)]
-        # === 1. Add neutron type on the grid ===
-        for neutron in self.neutrons: 
-            if neutron.is_alive: 
-                grid[neutron.x][neutron.y][neutron.type] += 1
+    def display_reactor_colorized(self, frame:dict): 
+        from rich import box
+        from rich.console import Group
+        from rich.panel import Panel
+        from rich.table import Table
+        from rich.text import Text
+
+        # === 1. Read neutrons number and dominant type of each cell ===
+        totals = frame["counts"].tolist()
+        dominants = NEUTRON_TYPES[frame["dominant"]].tolist()
         
         # === 2. Calculate average type ===
         table = Table(show_header=False, show_lines=True, box=box.SQUARE)
@@ -466,59 +1074,42 @@ class ReactorV2:
             "thermal": "#1E90FF"
         }
 
-        for i in range(self.n): 
+        for i in range(len(totals)): 
             row = []
-            for j in range(self.m): 
-                total = sum(grid[i][j].values())
+            for j in range(len(totals[i])): 
+                total = totals[i][j]
                 if total == 0 : 
                     row.append(' ')
                 else :
-                    # Find dominant type 
-                    dominant = max(grid[i][j], key=grid[i][j].get)
-                    text = Text(str(total), style=f"bold {color[dominant]}")
+                    # Dominant type gives the color
+                    text = Text(str(total), style=f"bold {color[dominants[i][j]]}")
                     row.append(text)
             table.add_row(*row)
         
         # === 3. Adding reactor infos on panel ===
-        # Reactor infos
-        total_neutrons = sum(1 for n in self.neutrons if n.is_alive)
-        power = self.power_history[-1]
-        temperature = self.temp_history[-1]
-        
-        # Rods infos
-        if self.rod_active:
-            rod_depth = "N/A"
-            if self.regulation_rods:
-                rod_depth = f"{100.0 - self.regulation_rods[0].position_percent:.2f}%" 
-                print(f"reg {self.regulation_rods[0].position_percent:.2f}")
-        else:
-            rod_depth = "--SYSTEM OFF--"
-
         info_text = (
-            f"[bold cyan]Temperature :[/bold cyan] {temperature} K\n"
-            f"[bold yellow]Power :[/bold yellow] {power} MW\n"
-            f"[bold magenta]Neutrons :[/bold magenta] {total_neutrons}\n"
-            f"[bold green]Depth of regulating bars :[/bold green] {rod_depth}\n"
-            f"[red]SCRAM bars used :[/red] {self.scram_triggered}\n"
+            f"[bold cyan]Temperature :[/bold cyan] {frame['temperature']} K\n"
+            f"[bold yellow]Power :[/bold yellow] {frame['power']} MW\n"
+            f"[bold magenta]Neutrons :[/bold magenta] {frame['neutrons']}\n"
+            f"[bold green]Depth of regulating bars :[/bold green] {frame['rod_depth']}\n"
+            f"[red]SCRAM bars used :[/red] {frame['scram_triggered']}\n"
         )
 
         info_panel = Panel(info_text, title="[bold white]Reactor State[/bold white]", border_style="bright_blue")
 
         # === 4. Compose different displays ===
-        display = Group(
+        return Group(
             Panel(table, title="[bold]Neutrons Distribution[/]"), 
             info_panel
         )
-        # Display infos and reactor 
-        self.live.update(display)
-        sleep(0.2)
 
     # ------------------------------------------------------------------
     # Update control rods positions based on power error
     # ------------------------------------------------------------------
-    def update_automatic_control_rods(self):
+    def update_automatic_control_rods(self, dt:float=None):
+        dt = self.dt if dt is None else dt
         if not self.regulation_rods:
-            print("ALERT : Regulation rod undected.")
+            self.events.emit("control.no_regulation", "Regulation rod undected.", level="warning")
             return 
         
         # === 0. If the reactor shuts down, we remove the control rods ===
@@ -526,7 +1117,7 @@ class ReactorV2:
             self.reg_integral_error = 0.0
             for rod in self.regulation_rods:
                 rod.target_position = 100.0
-            print("REACTOR OFF : Resetting rods to 100%")
+            self.events.emit("control.reactor_off", "REACTOR OFF : Resetting rods to 100%%")
             return 
 
         # === 1. Calculate error between current power and target power ===
@@ -538,17 +1129,17 @@ class ReactorV2:
         
         # === 3. Integral term (with anti-windup) ===
         # Error history calculation
-        self.reg_integral_error += error * self.dt
+        self.reg_integral_error += error * dt
         self.reg_integral_error = max(-1.0, min(1.0, self.reg_integral_error))
         i_term = self.reg_ki * self.reg_integral_error
 
         # === 4. Calculate new target position for regulation rods ===
         target_position = max(0.0, min(100.0, self.reg_base_position + kp + i_term))
-        print("test target_position", target_position)
+        self.events.emit("control.target", "target_position %.2f", target_position, level="debug")
 
         # === 5. Send instruction to each regulation rod ===
         clamped_target = max(0.0, min(100.0, target_position))
-        print("test current_temperature", self.current_temperature)
+        self.events.emit("control.temperature", "current_temperature %.2f", self.current_temperature, level="debug")
         
         # ====================================================
         #               Hysteresis algorithm
@@ -558,30 +1149,30 @@ class ReactorV2:
         # === 6.1. Control ===
         # === 6.1.1. RUNBACK ===
         # If current_power > 700 MW, the drop is activated. It is only deactivated if < 650 MW.
-        if self.current_power_mw > 700:
+        if self.current_power_mw > self.runback_band[0]:
             self.force_pull_up_active = True
-        elif self.current_power_mw < 650:
+        elif self.current_power_mw < self.runback_band[1]:
             self.force_pull_up_active = False
 
         # === 6.1.2 WITHDRAW ===
         # If current_power < 200 MW, we go back. We only deactivate if > 250 MW.
-        if self.current_power_mw < 200:
+        if self.current_power_mw < self.withdraw_band[0]:
             self.force_pull_down_active = True
-        elif self.current_power_mw > 250:
+        elif self.current_power_mw > self.withdraw_band[1]:
             self.force_pull_down_active = False
         
         # === 6.2. Action ===
         # === 6.2.1. Too much power ===
         if self.force_pull_up_active:
-            print(f"[PROTECTION] High Power (>900). Forcing Insertion.")
+            self.events.emit("protection.runback", "High Power (>%d). Forcing Insertion.", self.runback_band[0], level="warning")
             final_target = 0.0
-            self.reg_integral_error -= error * self.dt
+            self.reg_integral_error -= error * dt
 
         # === 6.2.2. Not enought power ===
         elif self.force_pull_down_active:
-            print(f"[PROTECTION] Low Power (<200). Forcing Withdrawal.")
+            self.events.emit("protection.withdraw", "Low Power (<%d). Forcing Withdrawal.", self.withdraw_band[0], level="warning")
             final_target = 100.0
-            self.reg_integral_error -= error * self.dt
+            self.reg_integral_error -= error * dt
 
         # === 7. Send orders ===
         for rod in self.regulation_rods:
@@ -594,12 +1185,13 @@ class ReactorV2:
     # ------------------------------------------------------------------
     def check_emergency_scram(self):
         if not self.scram_rods:
-            print("ALERT : emergency scram undected.")
+            self.events.emit("scram.missing", "Emergency scram undected.", level="warning")
             return
 
         if self.power_level > self.scram_threshold and not self.scram_triggered:            
             self.scram_triggered = True
             self.regulation_rods = None     # Disable autopilote
+            self.events.emit("scram.triggered", "Power level %.2f above %.2f, inserting all rods.", self.power_level, self.scram_threshold, level="critical")
             
             for rod in self.control_rods:
                 rod.target_position = 0.0   # Fully inserted
\ No newline at end of file
@@ -0,0 +1,317 @@
+# ==========================================================================================
+#                                     Benchmark Suite
+# ==========================================================================================
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+
+try:
+    import resource
+except ImportError:     # Not available on Windows, the peak RSS is then not reported
+    resource = None
+
+from ReactorV2 import ReactorV2
+from Neutron import Neutron
+from sampling import ActionSampler, make_rng
+from utils import simul_poisson, simul_poisson_batch, export_data
+
+# Every case runs with the same seed, so that two commits simulate the same reactors
+SEED = 12345
+
+# Configuration shared by the cases, headless
+BASE_CONFIG = {
+    'n_iter' : 100, 'n_initial' : 200, 'a' : 0.1, 'f' : 0.6, 'd' : 0.5, 'l' : 3,
+    'engine' : 'object', 'seed' : SEED,
+    'n' : 15, 'm' : 15, 'thermic_capacity' : 1e7, 'toric' : False,
+    'moderator' : 'heavy_water', 'initial_distribution' : 'uniform',
+    'max_speed' : 2, 'thermalization_probs' : {'fast_to_epi': 0.5, 'epi_to_thermal': 0.5},
+    'history' : 'dict', 'trajectory_export' : None,
+    'display' : False, 'colorized' : True, 'verbose' : False, 'quiet' : True,
+    'rod_active' : True, 'scram_threshold' : 2,
+    'control_rods' : [{'id': 'RE01', 'type': 'regulation'}, {'id': 'SC01', 'type': 'scram'}]
+}
+
+# Grid size, initial neutrons and steps of each scale
+SCALES = {
+    "small" : {'n' : 15, 'm' : 15, 'n_initial' : 200, 'n_iter' : 100},
+    "medium" : {'n' : 50, 'm' : 50, 'n_initial' : 2000, 'n_iter' : 100},
+    "large" : {'n' : 150, 'm' : 150, 'n_initial' : 20000, 'n_iter' : 50},
+}
+MODERATORS = ["graphite", "light_water", "heavy_water", "none"]
+ENGINES = ["object", "vectorized"]
+
+# A supercritical case stops once it holds this many times its initial neutrons
+MAX_GROWTH = 50
+
+# Compared metrics : True when a higher value is better
+METRICS = {
+    "steps_per_s" : True,
+    "updates_per_s" : True,
+    "export_mb_per_s" : True,
+    "frames_per_s" : True,
+    "poisson_per_s" : True,
+    "poisson_batch_per_s" : True,
+    "diffuse_per_s" : True,
+    "peak_rss_mb" : False,
+}
+
+
+# ------------------------------------------------------------------
+# Peak resident memory of the current process (MB)
+# ------------------------------------------------------------------
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+# ------------------------------------------------------------------
+# Configurations of the benchmark
+# ------------------------------------------------------------------
+# Returns:
+#     - dictionary {case name: configuration}, names are scale/moderator/engine
+def make_cases(scales:list, moderators:list=MODERATORS, engines:list=ENGINES):
+    cases = {}
+    for scale in scales:
+        for moderator in moderators:
+            for engine in engines:
+                cases[f"{scale}/{moderator}/{engine}"] = dict(BASE_CONFIG, **SCALES[scale], moderator=moderator, engine=engine)
+    return cases
+
+
+# ------------------------------------------------------------------
+# Time one simulation : steps, display and export
+# ------------------------------------------------------------------
+# The loop is the one of ReactorV2.simulate (step then record_step), without the
+# dashboard thread
+def time_simulation(config:dict, n_frames:int=20):
+    reactor = ReactorV2(None, config)
+    max_neutrons = MAX_GROWTH * max(config['n_initial'], 1)
+
+    # === 1. Simulation ===
+    updates = 0
+    start = time.perf_counter()
+    for iteration in range(reactor.n_iter):
+        size = reactor.count_neutrons()
+        if size == 0 or size > max_neutrons:
+            break
+        updates += size
+        reactor.step()
+        reactor.record_step(iteration)
+    wall = time.perf_counter() - start
+    steps = reactor.iteration
+
+    # === 2. Colorized display of the last frame ===
+    from rich.console import Console
+
+    console = Console(file=io.StringIO(), width=250)
+    frame = reactor.build_frame()
+    start = time.perf_counter()
+    for _ in range(n_frames):
+        console.print(reactor.display_reactor_colorized(frame))
+    frames_s = time.perf_counter() - start
+
+    # === 3. CSV export, in a temporary folder ===
+    # export_data writes under the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(folder)
+        try:
+            start = time.perf_counter()
+            export_data(reactor, config, "benchmark")
+            export_s = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        export_bytes = sum(
+            os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(folder) for f in files
+        )
+
+    return {
+        "steps" : steps,
+        "wall_s" : wall,
+        "steps_per_s" : steps / wall if wall > 0 else 0.0,
+        "neutron_updates" : updates,
+        "updates_per_s" : updates / wall if wall > 0 else 0.0,
+        "final_neutrons" : float(reactor.estimated_neutrons()),
+        "frames_per_s" : n_frames / frames_s,
+        "export_mb" : export_bytes / 1e6,
+        "export_s" : export_s,
+        "export_mb_per_s" : export_bytes / 1e6 / export_s if export_s > 0 else 0.0
+    }
+
+
+# ------------------------------------------------------------------
+# Time the small kernels called for every neutron
+# ------------------------------------------------------------------
+def time_kernels(n_calls:int=200000):
+    rng = make_rng(SEED)
+    results = {}
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        simul_poisson(3, rng)
+    results["poisson_per_s"] = n_calls / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    simul_poisson_batch(3, n_calls, rng)
+    results["poisson_batch_per_s"] = n_calls / (time.perf_counter() - start)
+
+    sampler = ActionSampler(rng)
+    neutron = Neutron(0, 0, 0)
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        neutron.diffuse(2, sampler)
+    results["diffuse_per_s"] = n_calls / (time.perf_counter() - start)
+    return results
+
+
+# ------------------------------------------------------------------
+# Run a case in the current process, the best of repeat runs is kept
+# ------------------------------------------------------------------
+def run_case(config:dict, repeat:int=1):
+    if config is None:
+        runs = [time_kernels() for _ in range(repeat)]
+        best = {name : max(run[name] for run in runs) for name in runs[0]}
+    else:
+        runs = [time_simulation(config) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["wall_s"])
+    best["peak_rss_mb"] = peak_rss_mb()
+    return best
+
+
+# ------------------------------------------------------------------
+# Run the benchmark, each case in a fresh process for its peak RSS
+# ------------------------------------------------------------------
+# Inputs:
+#     - cases : output of make_cases
+#     - repeat : runs of each case
+#     - kernels : also time the per neutron kernels
+# Returns:
+#     - dictionary {"meta", "results"} saved by save_results
+def run_benchmark(cases:dict, repeat:int=1, kernels:bool=True):
+    cases = dict({"kernels" : None} if kernels else {}, **cases)
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name, config in cases.items():
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(run_case, config, repeat).result()
+        print(f"+ {name:<32} {format_metrics(results[name])}")
+    return {"meta" : run_meta(repeat), "results" : results}
+
+
+# Context of the results, to know what is compared
+def run_meta(repeat:int):
+    try:
+        # git runs in the package folder, the benchmark can be launched from anywhere
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit" : commit,
+        "date" : datetime.now().isoformat(timespec="seconds"),
+        "python" : platform.python_version(),
+        "numpy" : np.__version__,
+        "platform" : platform.platform(),
+        "seed" : SEED,
+        "repeat" : repeat
+    }
+
+
+def format_metrics(metrics:dict):
+    return "   ".join(f"{name} {metrics[name]:.4g}" for name in METRICS if metrics.get(name) is not None)
+
+
+def save_results(report:dict, path:str):
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+# ------------------------------------------------------------------
+# Compare two benchmark files
+# ------------------------------------------------------------------
+# Inputs:
+#     - old, new : reports of run_benchmark
+#     - threshold : relative change counted as a regression (0.1 = 10 %)
+# Returns:
+#     - list of (case, metric, old value, new value, relative change, regression),
+#       a positive change is an improvement
+def compare(old:dict, new:dict, threshold:float=0.1):
+    rows = []
+    for case in old["results"]:
+        if case not in new["results"]:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before = old["results"][case].get(metric)
+            after = new["results"][case].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before if higher_is_better else (before - after) / before
+            rows.append((case, metric, before, after, change, change < -threshold))
+    return rows
+
+
+def format_comparison(rows:list, old:dict, new:dict):
+    lines = [f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}"]
+    for case, metric, before, after, change, regression in rows:
+        flag = "  REGRESSION" if regression else ""
+        lines.append(f"{case:<32} {metric:<20} {before:>12.4g} {after:>12.4g} {100 * change:>+8.1f} %{flag}")
+    return "\n".join(lines)
+
+
+# ---------------------------------------
+# Command line
+# ---------------------------------------
+# python src/benchmark.py run --scales small medium --output bench.json
+# python src/benchmark.py compare old.json new.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ReactorV2 hot paths and the export.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark and save the results as JSON")
+    run_parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    run_parser.add_argument("--moderators", nargs="+", choices=MODERATORS, default=MODERATORS)
+    run_parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    run_parser.add_argument("--repeat", type=int, default=1, help="runs of each case, the fastest is kept")
+    run_parser.add_argument("--no-kernels", action="store_true", help="skip the per neutron kernels")
+    run_parser.add_argument("--output", default=None, help="JSON file (default statistics/benchmarks/bench_<date>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON results")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="relative loss counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_benchmark(make_cases(args.scales, args.moderators, args.engines), args.repeat, not args.no_kernels)
+        output = args.output or os.path.join("statistics", "benchmarks", f"bench_{datetime.now().strftime('%Y_%m_%d_%H_%M_%S')}.json")
+        save_results(report, output)
+        print(f"+ Results saved to {output}")
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        rows = compare(old, new, args.threshold)
+        print(format_comparison(rows, old, new))
+        # A non zero exit code lets a script detect the regressions
+        sys.exit(1 if any(row[-1] for row in rows) else 0)
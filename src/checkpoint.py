@@ -0,0 +1,89 @@
+# ==========================================================================================
+#                                Checkpoint Restart and Fork
+# ==========================================================================================
+
+import argparse
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ReactorV2 import ReactorV2
+from sampling import BIT_GENERATORS
+
+
+# ------------------------------------------------------------------
+# Resume an interrupted run from its last checkpoint
+# ------------------------------------------------------------------
+# Inputs:
+#     - path : checkpoint written by ReactorV2.save_checkpoint
+#     - live : rich Live object for the display (optional)
+#     - config_overrides : configuration keys to change, e.g. {'n_iter': 5000}
+# Returns:
+#     - the reactor, simulated up to its n_iter steps
+def resume(path:str, live=None, config_overrides:dict=None):
+    reactor = ReactorV2.from_checkpoint(path, live, config_overrides)
+    reactor.simulate()
+    return reactor
+
+
+# ------------------------------------------------------------------
+# Restore a checkpoint with a new random stream
+# ------------------------------------------------------------------
+# Inputs:
+#     - path : checkpoint written by ReactorV2.save_checkpoint
+#     - seed_seq : numpy SeedSequence of this replica
+#     - config_overrides : configuration keys to change
+def fork_reactor(path:str, seed_seq, config_overrides:dict=None):
+    reactor = ReactorV2.from_checkpoint(path, None, config_overrides)
+    bit_generator = BIT_GENERATORS[reactor.config.get('bit_generator', 'PCG64')]
+    reactor.set_rng(np.random.Generator(bit_generator(seed_seq)))
+    return reactor
+
+
+def run_fork(path:str, seed_seq, config_overrides:dict=None, stop_when=None):
+    overrides = dict(config_overrides or {}, display=False, verbose=False, quiet=True, trajectory_export=None, checkpoint_every=0)
+    reactor = fork_reactor(path, seed_seq, overrides)
+    return reactor.run_metrics(stop_when)
+
+
+# ------------------------------------------------------------------
+# Run many replicas from the same saved state
+# ------------------------------------------------------------------
+# Inputs:
+#     - path : checkpoint written by ReactorV2.save_checkpoint, e.g. just before a SCRAM
+#     - n_replicas : number of replicas
+#     - seed : root seed, the replicas get the children of SeedSequence(seed)
+#     - n_workers : number of processes (None = all the cores, 1 = no pool)
+#     - config_overrides : configuration keys to change in every replica
+#     - stop_when : optional stop predicate of ReactorV2.run_metrics
+# Returns:
+#     - list of RunResult, one per replica
+def run_forks(path:str, n_replicas:int, seed=None, n_workers=None, config_overrides:dict=None, stop_when=None):
+    seeds = np.random.SeedSequence(seed).spawn(n_replicas)
+    if n_workers == 1:
+        return [run_fork(path, seed_seq, config_overrides, stop_when) for seed_seq in seeds]
+
+    n_workers = n_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(
+            run_fork, [path] * n_replicas, seeds, [config_overrides] * n_replicas, [stop_when] * n_replicas
+        ))
+
+
+# ---------------------------------------
+# Resume from the command line
+# ---------------------------------------
+if __name__ == "__main__":
+    from utils import export_data
+
+    parser = argparse.ArgumentParser(description="Resume a ReactorV2 run from a checkpoint.")
+    parser.add_argument("path", help="checkpoint file (.npz)")
+    parser.add_argument("--n-iter", type=int, default=None, help="new total number of steps")
+    args = parser.parse_args()
+
+    # Headless resume : the display needs a terminal
+    overrides = {"display" : False}
+    if args.n_iter is not None:
+        overrides["n_iter"] = args.n_iter
+    reactor = resume(args.path, config_overrides=overrides)
+    export_data(reactor, reactor.config)
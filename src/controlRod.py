@@ -71,4 +71,121 @@ class ControlRod:
         s_curve_factor = 0.5 * (1 - np.cos(np.pi * fraction_inserted))
         
         # Reactivity is the total "weight" * efficiency
-        return self.total_worth_pcm * s_curve_factor
\ No newline at end of file
+        return self.total_worth_pcm * s_curve_factor
+
+
+# ------------------------------------------------------------------
+# S-curve of the rods worth, tabulated once
+# ------------------------------------------------------------------
+# Fraction inserted (0=OUT, 1=IN) and normalized worth 0.5 * (1 - cos(pi * x))
+S_CURVE_FRACTION = np.linspace(0.0, 1.0, 1025)
+S_CURVE_WORTH = 0.5 * (1 - np.cos(np.pi * S_CURVE_FRACTION))
+
+
+class ControlRodBank:
+    """
+        All the control rods of a reactor as arrays : positions, targets, speeds and
+        worths. The rods are stepped together in one vectorized operation and their
+        worth is read from the tabulated S-curve. The rods of the bank are available
+        as RodView objects, with the same attributes as a ControlRod.
+    """
+
+    def __init__(self, rod_configs:list, events=None):
+        for rod_config in rod_configs:
+            if rod_config['type'] not in type_rod:
+                raise ValueError(f"Unknown control rod type: {rod_config['type']}")
+
+        self.ids = [rod_config['id'] for rod_config in rod_configs]
+        # The rods are addressed by id (events, material regions, checkpoints)
+        duplicates = sorted({rod_id for rod_id in self.ids if self.ids.count(rod_id) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate control rod ids: {', '.join(map(str, duplicates))}")
+        self.types = [rod_config['type'] for rod_config in rod_configs]
+        self.total_worth_pcm = np.array([type_rod[t]['total_worth_pcm'] for t in self.types], dtype=np.float64)
+        self.max_speed = np.array([type_rod[t]['max_speed'] for t in self.types], dtype=np.float64)
+
+        # 100.0 = fully withdrawn, 0.0 = fully inserted
+        self.position_percent = np.full(len(self.ids), 100.0)
+        self.target_position = np.full(len(self.ids), 100.0)
+
+        self.events = events
+        self.move_events = [f"rod.move.{rod_id}" for rod_id in self.ids]
+        self.rods = [RodView(self, index) for index in range(len(self.ids))]
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    # ------------------------------------------------------------------
+    # Move every rod towards its target position based on its speed
+    # ------------------------------------------------------------------
+    def step(self, dt:float):
+        # === 1. Calculate distance error ===
+        error = self.target_position - self.position_percent
+        max_move = self.max_speed * dt
+
+        # === 2. Reach the target or move of max_move towards it ===
+        moved = np.where(
+            np.abs(error) < max_move,
+            self.target_position,
+            self.position_percent + np.sign(error) * max_move
+        )
+
+        # === 3. Clamp position between 0 and 100% ===
+        self.position_percent = np.clip(moved, 0.0, 100.0)
+
+        if self.events is not None and self.events.enabled_for("debug"):
+            for index in np.flatnonzero(error != 0.0).tolist():
+                self.events.emit(self.move_events[index], "Rod %s moved to %.2f%% (Target: %.2f)", self.ids[index], self.position_percent[index], self.target_position[index], level="debug")
+
+
+    # ------------------------------------------------------------------
+    # Reactivity worth of every rod (pcm), from the S-curve table
+    # ------------------------------------------------------------------
+    def reactivity_pcm(self):
+        fraction_inserted = (100.0 - self.position_percent) / 100.0
+        return self.total_worth_pcm * np.interp(fraction_inserted, S_CURVE_FRACTION, S_CURVE_WORTH)
+
+
+    def total_reactivity_pcm(self):
+        return float(self.reactivity_pcm().sum())
+
+
+class RodView:
+    """
+        One rod of a ControlRodBank, read and written through the bank arrays. 
+    """
+
+    def __init__(self, bank:ControlRodBank, index:int):
+        self.bank = bank
+        self.index = index
+        self.id = bank.ids[index]
+        self.type = bank.types[index]
+        self.total_worth_pcm = float(bank.total_worth_pcm[index])
+        self.max_speed = float(bank.max_speed[index])
+
+
+    @property
+    def position_percent(self):
+        return float(self.bank.position_percent[self.index])
+
+
+    @position_percent.setter
+    def position_percent(self, value:float):
+        self.bank.position_percent[self.index] = value
+
+
+    @property
+    def target_position(self):
+        return float(self.bank.target_position[self.index])
+
+
+    @target_position.setter
+    def target_position(self, value:float):
+        self.bank.target_position[self.index] = value
+
+
+    def get_reactivity_pcm(self):
+        fraction_inserted = (100.0 - self.position_percent) / 100.0
+        return self.total_worth_pcm * float(np.interp(fraction_inserted, S_CURVE_FRACTION, S_CURVE_WORTH))
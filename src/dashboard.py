@@ -0,0 +1,70 @@
+# ==========================================================================================
+#                                     Live Dashboard
+# ==========================================================================================
+
+import threading
+
+
+class LiveDashboard:
+    """
+        Render the reactor state on its own thread, at a fixed frame rate. The simulation
+        only publishes its latest state and never waits for the terminal : when rendering
+        falls behind, the intermediate states are dropped.
+    """
+
+    def __init__(self, live, render, fps:float=5.0):
+        self.live = live                # rich.live.Live object
+        self.render = render            # Function frame -> rich renderable
+        self.period = 1.0 / fps
+
+        self.latest = (0, None)         # (id, frame) of the latest published frame
+        self.n_published = 0
+        self.rendered_id = 0
+        self.n_rendered = 0
+        self.n_dropped = 0
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+
+    # ------------------------------------------------------------------
+    # Publish the latest state (called by the simulation)
+    # ------------------------------------------------------------------
+    def publish(self, frame):
+        # Replacing the reference is atomic, the renderer always sees a whole frame
+        self.n_published += 1
+        self.latest = (self.n_published, frame)
+
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+
+    # ------------------------------------------------------------------
+    # Stop the renderer, the last published frame is always displayed
+    # ------------------------------------------------------------------
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self._draw()
+
+
+    def _run(self):
+        while not self.stop_event.wait(self.period):
+            self._draw()
+
+
+    def _draw(self):
+        frame_id, frame = self.latest
+        if frame is None or frame_id == self.rendered_id:
+            return
+        # Frames published since the last rendering are skipped
+        self.n_dropped += frame_id - self.rendered_id - 1
+        self.rendered_id = frame_id
+        self.live.update(self.render(frame))
+        self.n_rendered += 1
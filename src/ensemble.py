@@ -0,0 +1,136 @@
+# ==========================================================================================
+#                                Monte Carlo Ensemble Runner
+# ==========================================================================================
+
+import math
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ReactorV2 import ReactorV2
+
+
+# ------------------------------------------------------------------
+# Run one replica and keep only a compact summary
+# ------------------------------------------------------------------
+# Inputs:
+#     - config : ReactorV2 configuration
+#     - seed_seq : numpy SeedSequence of this replica
+# Returns:
+#     - extinction_step : first step without neutrons, -1 if the population survived
+#     - counts : number of neutrons at each step, NaN after a stop other than the extinction
+def run_replica(config:dict, seed_seq):
+    # Only the population size is needed : metrics only run, stopped at extinction
+    replica_config = dict(config, seed=seed_seq, rng=None, display=False, verbose=False, trajectory_export=None)
+    reactor = ReactorV2(None, replica_config)
+    result = reactor.run_metrics()
+
+    # After the extinction the population stays at 0, after a predicate or a
+    # converged k-eff it is unknown
+    counts = np.full(reactor.n_iter, 0.0 if result.extinct else np.nan)
+    counts[:result.n_steps] = result.counts
+    return result.extinction_step, counts
+
+
+class EnsembleResult:
+    """
+        Summaries of the replicas of an ensemble, with the extinction estimators
+        and their confidence intervals.
+    """
+
+    def __init__(self, extinction_steps, counts):
+        self.extinction_steps = np.asarray(extinction_steps, dtype=np.int64)
+        self.counts = counts            # One population trajectory per replica
+        self.n_runs = len(self.extinction_steps)
+
+
+    # ---------------------------------------
+    # Extinction probability
+    # ---------------------------------------
+    def extinction_probability(self):
+        return float(np.mean(self.extinction_steps >= 0))
+
+
+    # Wilson score interval of the extinction probability
+    def extinction_probability_ci(self, confidence:float=0.95):
+        z = normal_quantile(0.5 + confidence / 2)
+        p = self.extinction_probability()
+        n = self.n_runs
+        center = (p + z**2 / (2*n)) / (1 + z**2 / n)
+        half_width = z / (1 + z**2 / n) * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2))
+        return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+    # ---------------------------------------
+    # Mean time to extinction (extinct replicas only)
+    # ---------------------------------------
+    def mean_time_to_extinction(self):
+        times = self.extinction_steps[self.extinction_steps >= 0]
+        return float(np.mean(times)) if len(times) else np.inf
+
+
+    # Normal approximation interval of the mean time to extinction
+    def mean_time_to_extinction_ci(self, confidence:float=0.95):
+        times = self.extinction_steps[self.extinction_steps >= 0]
+        if len(times) < 2:
+            return -np.inf, np.inf
+        z = normal_quantile(0.5 + confidence / 2)
+        half_width = z * float(np.std(times, ddof=1)) / math.sqrt(len(times))
+        mean = float(np.mean(times))
+        return mean - half_width, mean + half_width
+
+
+    # ---------------------------------------
+    # Mean population size at each step
+    # ---------------------------------------
+    # Replicas stopped before a step (predicate, converged k-eff) are left out of its
+    # mean, see replicas_per_step. NaN when no replica reached the step.
+    def mean_counts(self):
+        counts = np.vstack(self.counts)
+        n_replicas = self.replicas_per_step()
+        return np.divide(np.nansum(counts, axis=0), n_replicas, out=np.full(counts.shape[1], np.nan), where=n_replicas > 0)
+
+
+    # Number of replicas contributing to each step (extinct replicas count as 0 neutrons)
+    def replicas_per_step(self):
+        return np.sum(~np.isnan(np.vstack(self.counts)), axis=0)
+
+
+# ------------------------------------------------------------------
+# Run independent replicas of a reactor on a pool of processes
+# ------------------------------------------------------------------
+# Inputs:
+#     - config : ReactorV2 configuration
+#     - n_runs : number of replicas
+#     - seed : root seed, the replicas get the children of SeedSequence(seed)
+#     - n_workers : number of processes (None = all the cores, 1 = no pool)
+# Returns:
+#     - EnsembleResult
+def run_ensemble(config:dict, n_runs:int=20, seed=None, n_workers=None):
+    seeds = np.random.SeedSequence(seed).spawn(n_runs)
+
+    if n_workers == 1:
+        results = [run_replica(config, seed_seq) for seed_seq in seeds]
+    else:
+        n_workers = n_workers or os.cpu_count()
+        chunksize = max(1, n_runs // (4 * n_workers))
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(run_replica, [config] * n_runs, seeds, chunksize=chunksize))
+
+    extinction_steps = [step for step, _ in results]
+    counts = [counts for _, counts in results]
+    return EnsembleResult(extinction_steps, counts)
+
+
+# ------------------------------------------------------------------
+# Quantile of the standard normal distribution (bisection on erf)
+# ------------------------------------------------------------------
+def normal_quantile(p:float):
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        mid = (low + high) / 2
+        if 0.5 * (1 + math.erf(mid / math.sqrt(2))) < p:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
@@ -0,0 +1,224 @@
+# ==========================================================================================
+#                                 Columnar History Store
+# ==========================================================================================
+
+import bisect
+import zlib
+import numpy as np
+
+from population import NEUTRON_TYPES
+
+COLUMNS = {"id" : np.int64, "x" : np.int32, "y" : np.int32, "type" : np.uint8}
+
+
+class HistoryStore:
+    """
+        Keep the neutrons snapshots in contiguous typed columns (id, x, y, type) instead
+        of one dictionary per step. A snapshot is located with the offsets index and
+        rows are grouped in chunks which can be compressed once they are full.
+    """
+
+    def __init__(self, stride:int=1, compress:bool=False, chunk_rows:int=1_000_000):
+        self.stride = stride            # A snapshot is kept every `stride` steps, 0 = counts only
+        self.compress = compress        # Compress full chunks with zlib
+        self.chunk_rows = chunk_rows
+
+        self.n_steps = 0
+        self.counts = []                # Number of neutrons at every step (even without snapshot)
+        self.steps = []                 # Step index of each snapshot
+        self.offsets = [0]              # First row of each snapshot, last value = total rows
+
+        # Full chunks : dict of columns, raw arrays or compressed bytes
+        self.chunks = []
+        self.chunk_starts = []          # First row of each chunk
+        self.chunk_lens = []
+        # Rows of the chunk being filled
+        self.pending = {name : [] for name in COLUMNS}
+        self.pending_rows = 0
+        # Last decompressed chunk
+        self.decoded_index = -1
+        self.decoded = {}
+
+
+    # ------------------------------------------------------------------
+    # Add the state of a step
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - ids, xs, ys : arrays of the neutrons ids and positions
+    #     - types : array of neutron type codes (see population.TYPE_CODES)
+    def append(self, ids, xs, ys, types):
+        step = self.n_steps
+        self.n_steps += 1
+        self.counts.append(len(ids))
+        if self.stride == 0 or step % self.stride != 0:
+            return
+
+        self.steps.append(step)
+        self.offsets.append(self.offsets[-1] + len(ids))
+        for name, values in zip(COLUMNS, (ids, xs, ys, types)):
+            self.pending[name].append(np.array(values, dtype=COLUMNS[name]))
+        self.pending_rows += len(ids)
+
+        if self.pending_rows >= self.chunk_rows:
+            self.flush()
+
+
+    # ------------------------------------------------------------------
+    # Close the chunk being filled
+    # ------------------------------------------------------------------
+    def flush(self):
+        if self.pending_rows == 0:
+            return
+        chunk = {}
+        for name, dtype in COLUMNS.items():
+            column = np.concatenate(self.pending[name]).astype(dtype, copy=False)
+            chunk[name] = zlib.compress(column.tobytes(), 1) if self.compress else column
+        self.chunk_starts.append(self.offsets[-1] - self.pending_rows)
+        self.chunk_lens.append(self.pending_rows)
+        self.chunks.append(chunk)
+        self.pending = {name : [] for name in COLUMNS}
+        self.pending_rows = 0
+
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self.steps)
+
+
+    def __getitem__(self, k:int):
+        """
+            Snapshot k in the old {id: (x, y, type)} format, for compatibility only.
+        """
+        ids, xs, ys, types = self.snapshot(k)
+        return dict(zip(ids.tolist(), zip(xs.tolist(), ys.tolist(), NEUTRON_TYPES[types].tolist())))
+
+
+    def get_counts(self):
+        return np.array(self.counts, dtype=np.int64)
+
+
+    # Columns of the full chunk `index`, a compressed chunk is decoded once and kept
+    # until another chunk is read
+    def _chunk(self, index:int):
+        chunk = self.chunks[index]
+        if not self.compress:
+            return chunk
+        if self.decoded_index != index:
+            self.decoded = {
+                name : np.frombuffer(zlib.decompress(column), dtype=COLUMNS[name])
+                for name, column in chunk.items()
+            }
+            self.decoded_index = index
+        return self.decoded
+
+
+    # Returns rows [start, stop) of the given columns, the rows not flushed yet included
+    def _rows(self, start:int, stop:int, names=tuple(COLUMNS)):
+        parts = {name : [] for name in names}
+
+        # === 1. Full chunks ===
+        for index in range(max(bisect.bisect_right(self.chunk_starts, start) - 1, 0), len(self.chunks)):
+            chunk_start = self.chunk_starts[index]
+            chunk_stop = chunk_start + self.chunk_lens[index]
+            if chunk_start >= stop:
+                break
+            if chunk_stop <= start:
+                continue
+            columns = self._chunk(index)
+            lo, hi = max(start, chunk_start) - chunk_start, min(stop, chunk_stop) - chunk_start
+            for name in names:
+                parts[name].append(columns[name][lo:hi])
+
+        # === 2. Pending rows, one array per snapshot ===
+        first_pending = len(self.steps) - len(self.pending["id"])
+        for k in range(max(bisect.bisect_right(self.offsets, start) - 1, first_pending), len(self.steps)):
+            snapshot_start, snapshot_stop = self.offsets[k], self.offsets[k + 1]
+            if snapshot_start >= stop:
+                break
+            if snapshot_stop <= start:
+                continue
+            lo, hi = max(start, snapshot_start) - snapshot_start, min(stop, snapshot_stop) - snapshot_start
+            for name in names:
+                parts[name].append(self.pending[name][k - first_pending][lo:hi])
+
+        return [
+            np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=COLUMNS[name])
+            for name in names
+        ]
+
+
+    # ------------------------------------------------------------------
+    # Snapshot k as arrays (ids, xs, ys, types)
+    # ------------------------------------------------------------------
+    def snapshot(self, k:int):
+        if k < 0:
+            k += len(self.steps)
+        return self._rows(self.offsets[k], self.offsets[k + 1])
+
+
+    # ------------------------------------------------------------------
+    # Stored rows, chunk by chunk
+    # ------------------------------------------------------------------
+    # Every chunk is decoded once, the pending rows come last as one block
+    # Returns:
+    #     - iterator of (steps, ids, xs, ys, types), one value per stored neutron position
+    def iter_chunks(self):
+        blocks = [(self.chunk_starts[index], self.chunk_lens[index], index) for index in range(len(self.chunks))]
+        if self.pending_rows:
+            blocks.append((self.offsets[-1] - self.pending_rows, self.pending_rows, None))
+
+        for block_start, block_len, index in blocks:
+            if index is None:
+                columns = {name : np.concatenate(self.pending[name]) for name in COLUMNS}
+            else:
+                columns = self._chunk(index)
+            # Chunks hold whole snapshots
+            first = bisect.bisect_left(self.offsets, block_start)
+            last = bisect.bisect_left(self.offsets, block_start + block_len)
+            steps = np.repeat(np.array(self.steps[first:last], dtype=np.int64), np.diff(self.offsets[first:last + 1]))
+            yield (steps,) + tuple(columns[name] for name in COLUMNS)
+
+
+    # ------------------------------------------------------------------
+    # Whole history as columns
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - steps, ids, xs, ys, types : one value per stored neutron position
+    def columns(self):
+        blocks = list(self.iter_chunks())
+        if not blocks:
+            return (np.empty(0, dtype=np.int64),) + tuple(np.empty(0, dtype=dtype) for dtype in COLUMNS.values())
+        return tuple(np.concatenate(column) for column in zip(*blocks))
+
+
+    # ------------------------------------------------------------------
+    # Trajectories of some neutrons
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - dictionary {id: (xs, ys)} over the snapshots where the neutron is alive
+    def trajectories(self, neutron_ids):
+        parts = {neutron_id : ([], []) for neutron_id in neutron_ids}
+        for _, ids, xs, ys, _ in self.iter_chunks():
+            for neutron_id, (part_xs, part_ys) in parts.items():
+                mask = ids == neutron_id
+                part_xs.append(xs[mask])
+                part_ys.append(ys[mask])
+        return {
+            neutron_id : (
+                np.concatenate(part_xs) if part_xs else np.empty(0, dtype=COLUMNS["x"]),
+                np.concatenate(part_ys) if part_ys else np.empty(0, dtype=COLUMNS["y"])
+            )
+            for neutron_id, (part_xs, part_ys) in parts.items()
+        }
+
+
+# ------------------------------------------------------------------
+# Number of neutrons at each step, whatever the history format
+# ------------------------------------------------------------------
+def population_counts(history):
+    if isinstance(history, HistoryStore):
+        return history.get_counts().tolist()
+    return [len(snapshot) for snapshot in history]
+
@@ -0,0 +1,119 @@
+# ==========================================================================================
+#                                 k-effective Estimator
+# ==========================================================================================
+
+import math
+import numpy as np
+
+
+class KeffEstimator:
+    """
+        Generation based k-effective. Every neutron knows its generation (the initial
+        neutrons are generation 0, fission children are one more than their parent).
+        Once no neutron of generation g or older is alive, all the children of g are
+        born and k_g = born[g+1] / born[g] is final. The first n_inactive generations
+        are discarded while the source converges, the next ones are grouped by batches
+        of batch_size generations for the running mean and its standard error.
+    """
+
+    def __init__(self, n_inactive:int=5, batch_size:int=1, tolerance:float=None, min_active:int=10):
+        self.n_inactive = n_inactive
+        self.batch_size = batch_size
+        self.tolerance = tolerance          # Standard error to reach, None = never converged
+        self.min_active = min_active        # Minimal number of active batches before stopping
+
+        self.born = []                      # Neutrons (or weights) born in each generation
+        self.n_complete = 0                 # Generations whose children are all born
+        self.k_generations = []             # k of each complete generation
+        self.k_batches = []                 # k of each active batch
+        self.batch_born = [0.0, 0.0]        # (parents, children) of the current batch
+        self.batch_count = 0
+
+
+    # ------------------------------------------------------------------
+    # Count new neutrons in their generation
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - generations : generation of each new neutron
+    #     - weights : optional statistical weights (weighted mode)
+    def record_births(self, generations, weights=None):
+        if len(generations) == 0:
+            return
+        counts = np.bincount(generations, weights=weights)
+        if len(counts) > len(self.born):
+            self.born.extend([0.0] * (len(counts) - len(self.born)))
+        for g in np.flatnonzero(counts).tolist():
+            self.born[g] += float(counts[g])
+
+
+    # ------------------------------------------------------------------
+    # Close the generations without alive neutrons (called after each step)
+    # ------------------------------------------------------------------
+    # Input:
+    #     - alive_generations : generation of each alive neutron
+    def update(self, alive_generations):
+        oldest = int(alive_generations.min()) if len(alive_generations) else len(self.born)
+        while self.n_complete < min(oldest, len(self.born)):
+            g = self.n_complete
+            parents = self.born[g]
+            children = self.born[g + 1] if g + 1 < len(self.born) else 0.0
+            self.k_generations.append(children / parents if parents > 0 else 0.0)
+            self.n_complete += 1
+
+            # === Active generations are grouped by batches ===
+            if g < self.n_inactive or parents <= 0:
+                continue
+            self.batch_born[0] += parents
+            self.batch_born[1] += children
+            self.batch_count += 1
+            if self.batch_count == self.batch_size:
+                self.k_batches.append(self.batch_born[1] / self.batch_born[0])
+                self.batch_born = [0.0, 0.0]
+                self.batch_count = 0
+
+
+    # ------------------------------------------------------------------
+    # Statistics of the active batches
+    # ------------------------------------------------------------------
+    def mean(self):
+        return float(np.mean(self.k_batches)) if self.k_batches else float("nan")
+
+
+    def std_error(self):
+        if len(self.k_batches) < 2:
+            return float("inf")
+        return float(np.std(self.k_batches, ddof=1) / math.sqrt(len(self.k_batches)))
+
+
+    # Running mean and standard error after each active batch
+    def running(self):
+        k = np.array(self.k_batches)
+        n = np.arange(1, len(k) + 1)
+        means = np.cumsum(k) / n
+        variances = (np.cumsum(k**2) - n * means**2) / np.maximum(n - 1, 1)
+        errors = np.where(n > 1, np.sqrt(np.maximum(variances, 0.0) / n), np.inf)
+        return means, errors
+
+
+    def converged(self):
+        return (
+            self.tolerance is not None
+            and len(self.k_batches) >= self.min_active
+            and self.std_error() < self.tolerance
+        )
+
+
+    # ------------------------------------------------------------------
+    # State for the checkpoints
+    # ------------------------------------------------------------------
+    def state(self):
+        return {
+            "born" : self.born, "n_complete" : self.n_complete,
+            "k_generations" : self.k_generations, "k_batches" : self.k_batches,
+            "batch_born" : self.batch_born, "batch_count" : self.batch_count
+        }
+
+
+    def restore(self, state:dict):
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -2,9 +2,10 @@
 #                                      Main
 # ==========================================================================================
 
-from rich.live import Live
+import argparse
+import json
+
 from ReactorV2 import ReactorV2
-from utils import export_data
 
 # Configuration parameters for a class II Reactor
 config = {
@@ -15,32 +16,124 @@ config = {
     'f' : 0.6,          # proba for fission
     'd' : 0.5,          # proba for diffusion
     'l' : 3,            # Parameter of the fish law
+    'engine' : 'object',    # 'object' (one Neutron per agent) or 'vectorized' (NumPy arrays)
+    'weighted' : False,         # Vectorized engine : weighted neutrons with implicit capture and weight window
+    'population_target' : None, # Weighted neutrons : comb the population to this size at each step (None = n_initial)
+    'keff' : None,              # Generation k-eff, e.g. {'n_inactive': 5, 'batch_size': 1, 'tolerance': 0.01} (stops once converged)
+    'seed' : None,          # Seed of the random generator (None = fresh entropy), same seed and engine = same run
+    'bit_generator' : 'PCG64',  # 'PCG64', 'PCG64DXSM' or 'Philox'
     # === Reactor settings ===&
     'n' : 15, 
     'm' : 15,
     'thermic_capacity' : 1e7,
     'toric' : False,
     'moderator' : 'heavy_water',        # 'graphite', 'light_water', 'heavy_water'
+    'material_map' : None,              # Material layout and localized rods, e.g. 'src/maps/reflected_core.txt'
     'initial_distribution' : 'uniform', # 'center', 'uniform', 'normal'
     # === Neutrons settings ===
     'max_speed' : 2,
     'thermalization_probs': {'fast_to_epi': 0.5, 'epi_to_thermal': 0.5}, 
+    # === History settings ===
+    'history' : 'dict',         # 'dict' (one dictionary per step) or 'columnar' (typed arrays)
+    'history_stride' : 1,       # Columnar history : keep a snapshot every `history_stride` steps (0 = counts only)
+    'history_compress' : False, # Columnar history : compress full chunks
+    'trajectory_export' : None, # Stream trajectories during the run, e.g. {'path': 'statistics/traj', 'format': 'npz'}
+    'trajectory_recorder' : None, # Keep the last positions in memory, e.g. {'capacity': 100000} rows
+    # === Checkpoint settings ===
+    'checkpoint_every' : 0,     # Save the reactor state every `checkpoint_every` steps (0 = never)
+    'checkpoint_path' : 'statistics/checkpoint.npz',    # Resume with : python src/checkpoint.py <path>
     # === Display settings ===
     'display' : True, 
     'colorized' : True,
+    'display_fps' : 5,          # Dashboard refresh rate, the simulation never waits for it
+    'display_max_cells' : 40,   # Larger grids are displayed as blocks of cells
+    'occupancy' : 'dense',      # 'dense' (n x m arrays) or 'sparse' (occupied cells only, for very large grids)
     'verbose' : False,
+    'profile' : False,          # Time the phases of each step, summarised at the end and exported with the run
+    'quiet' : False,            # Do not print the simulation events
+    'log_level' : 'info',       # 'debug', 'info', 'warning', 'critical' or 'off'
+    'log_rate_limit' : 10,      # Minimal number of steps between two events of the same kind
     # === Control rods settings ===
     'rod_active' : True,
     'scram_threshold' : 2,      # Threshold for emergency scram
+    'reg_kp' : 25.0,            # Regulation gains
+    'reg_ki' : 10.0,
+    'runback_band' : (700, 650),    # Forced insertion above 700 MW, released below 650 MW
+    'withdraw_band' : (200, 250),   # Forced withdrawal below 200 MW, released above 250 MW
+    'thermal_substeps' : 1,     # Thermal and rods substeps per neutron step
+    'thermal_integrator' : 'euler', # 'euler' or 'exponential' (exact for the power of the step)
     'control_rods' : [          # Initialisation of rods
         {'id': 'RE01', 'type': 'regulation'},
         {'id': 'SC01', 'type': 'scram'}
     ]
 }
 
-with Live(refresh_per_second=10) as live: 
-    reactorV2 = ReactorV2(live, config)
-    history = reactorV2.simulate()
 
-# Data export
-export_data(reactorV2, config)
\ No newline at end of file
+# ------------------------------------------------------------------
+# Run the reactor of a configuration
+# ------------------------------------------------------------------
+# rich and pandas are only imported when the display and the export are used
+# Inputs:
+#     - run_config : ReactorV2 configuration
+#     - export : write the CSV outputs (utils.export_data)
+# Returns:
+#     - the ReactorV2 after its run
+def run(run_config:dict, export:bool=True):
+    if run_config['display']:
+        from rich.live import Live
+
+        with Live(refresh_per_second=10) as live: 
+            reactorV2 = ReactorV2(live, run_config)
+            reactorV2.simulate()
+    else:
+        reactorV2 = ReactorV2(None, run_config)
+        reactorV2.simulate()
+
+    # Data export
+    if export:
+        from utils import export_data
+        export_data(reactorV2, run_config)
+    return reactorV2
+
+
+# ------------------------------------------------------------------
+# Command line, e.g. on a batch node :
+#     python src/main.py --headless --seed 1 --set n_iter=500 --set engine='"vectorized"'
+# ------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ReactorV2 configuration of main.py.")
+    parser.add_argument("--headless", action="store_true", help="no live display (rich is not imported)")
+    parser.add_argument("--no-export", action="store_true", help="do not write the CSV outputs (pandas is not imported)")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the run")
+    parser.add_argument("--n-iter", type=int, default=None, help="number of steps")
+    parser.add_argument("--engine", choices=["object", "vectorized"], default=None)
+    parser.add_argument("--profile", action="store_true", help="time the phases of each step")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="change a configuration key, the value is read as JSON (plain text otherwise)")
+    args = parser.parse_args(argv)
+
+    run_config = dict(config)
+    for item in args.set:
+        key, _, value = item.partition("=")
+        if key not in config:
+            parser.error(f"unknown configuration key: {key}")
+        try:
+            run_config[key] = json.loads(value)
+        except json.JSONDecodeError:
+            run_config[key] = value
+    if args.headless:
+        run_config['display'] = False
+    if args.seed is not None:
+        run_config['seed'] = args.seed
+    if args.n_iter is not None:
+        run_config['n_iter'] = args.n_iter
+    if args.engine is not None:
+        run_config['engine'] = args.engine
+    if args.profile:
+        run_config['profile'] = True
+
+    run(run_config, export=not args.no_export)
+
+
+if __name__ == "__main__":
+    main()
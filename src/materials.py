@@ -0,0 +1,204 @@
+# ==========================================================================================
+#                                      Material Map
+# ==========================================================================================
+
+import numpy as np
+
+
+class Moderator:
+    """
+        Slow down neutrons depending on its efficiency.
+    """
+
+    def __init__(self, name:str, absorb_coeff:float, diffuse_coeff:float, fission_coeff:float, slow_fast, slow_epi=0.3):
+        self.name = name
+        self.absorb_coeff = absorb_coeff
+        self.diffuse_coeff = diffuse_coeff
+        self.fission_coeff = fission_coeff
+        self.slow_fast = slow_fast
+        self.slow_epi = slow_epi
+
+
+# === Moderator Parameters ===
+MODERATORS = {
+    "light_water": Moderator("light_water", absorb_coeff=1.0, diffuse_coeff=1.2, fission_coeff=0.8, slow_fast=0.3, slow_epi=0.5),
+    "graphite":   Moderator("graphite",   absorb_coeff=0.6, diffuse_coeff=1.0, fission_coeff=0.9, slow_fast=0.15, slow_epi=0.3),
+    "heavy_water": Moderator("heavy_water", absorb_coeff=0.3, diffuse_coeff=1.1, fission_coeff=1.0, slow_fast=0.25, slow_epi=0.4),
+}
+
+# Cells without moderator : the configuration a/f/d are used and the neutrons
+# slow down with the thermalization probabilities while they age
+BARE = "none"
+
+
+# ------------------------------------------------------------------
+# Material of the cells without moderator
+# ------------------------------------------------------------------
+def bare_material(config:dict):
+    probs = config['thermalization_probs']
+    return Moderator(BARE, config['a'], config['d'], config['f'], probs['fast_to_epi'], probs['epi_to_thermal'])
+
+
+class MaterialMap:
+    """
+        Material of each cell and localized control rods. Cells sharing a material and
+        the same set of rods form a zone, and every per cell quantity is a lookup table
+        indexed by zone : each step only recomputes the zones thresholds, then the
+        neutrons read theirs with a gather on their cell.
+    """
+
+    def __init__(self, n:int, m:int, materials:list, layout=None, rod_regions:dict=None):
+        self.n, self.m = n, m
+        self.materials = materials                              # List of Moderator
+        self.rod_ids = list(rod_regions or {})                  # Rods acting on a part of the grid only
+        self.uniform = layout is None and not self.rod_ids      # Same probabilities on every cell
+
+        # === 1. Zone of each cell ===
+        if self.uniform:
+            self.zone = None
+            zone_material = np.zeros(1, dtype=np.int64)
+            self.zone_rods = np.zeros((1, 0))
+        else:
+            layout = np.zeros((n, m), dtype=np.int64) if layout is None else np.asarray(layout, dtype=np.int64)
+            masks = [np.asarray(rod_regions[rod_id], dtype=bool).ravel() for rod_id in self.rod_ids]
+            keys = np.stack([layout.ravel()] + masks, axis=1).astype(np.int64)
+            zone_keys, zone = np.unique(keys, axis=0, return_inverse=True)
+            self.zone = zone.ravel().astype(np.int32)
+            zone_material = zone_keys[:, 0]
+            self.zone_rods = zone_keys[:, 1:].astype(np.float64)
+
+        # === 2. Zones coefficients ===
+        zone_materials = [materials[k] for k in zone_material.tolist()]
+        self.zone_a = np.array([mat.absorb_coeff for mat in zone_materials])
+        self.zone_f = np.array([mat.fission_coeff for mat in zone_materials])
+        self.zone_d = np.array([mat.diffuse_coeff for mat in zone_materials])
+
+        # Thermalization probability by (type, zone), thermal neutrons do not change
+        self.slow = np.zeros((3, len(zone_materials)))
+        self.slow[0] = [mat.slow_fast for mat in zone_materials]
+        self.slow[2] = [mat.slow_epi for mat in zone_materials]
+
+        # Neutrons age in the cells without moderator
+        self.ages = np.array([mat.name == BARE for mat in zone_materials])
+        self.zone_moderators = [None if mat.name == BARE else mat for mat in zone_materials]
+
+
+    # ------------------------------------------------------------------
+    # Zone of the given cells
+    # ------------------------------------------------------------------
+    # Positions outside the grid are clipped, their neutrons are removed at the end of the step
+    def zone_of(self, xs, ys):
+        if self.uniform:
+            return np.zeros(len(xs), dtype=np.intp)
+        cells = np.clip(xs, 0, self.n - 1) * self.m + np.clip(ys, 0, self.m - 1)
+        return self.zone[cells]
+
+
+    def zone_at(self, x:int, y:int):
+        if self.uniform:
+            return 0
+        return int(self.zone[min(max(x, 0), self.n - 1) * self.m + min(max(y, 0), self.m - 1)])
+
+
+    # Moderator used by Neutron.evolve on a cell (None without moderator)
+    def moderator_at(self, x:int, y:int):
+        return self.zone_moderators[self.zone_at(x, y)]
+
+
+    # ------------------------------------------------------------------
+    # Action thresholds of every zone for the current rods positions
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - rod_pcm : dictionary {rod id: reactivity in pcm}
+    # Returns:
+    #     - (2, n_zones, 2) array, [thermal, zone] gives the (diffusion, absorption)
+    #       cumulated probabilities, see sampling.ActionSampler.actions_at
+    def action_table(self, rod_pcm:dict):
+        # Rods without region act on the whole grid
+        global_pcm = sum(pcm for rod_id, pcm in rod_pcm.items() if rod_id not in self.rod_ids)
+        local_pcm = np.array([rod_pcm.get(rod_id, 0.0) for rod_id in self.rod_ids])
+        reactivity_factor = np.maximum(1.0 + (global_pcm + self.zone_rods @ local_pcm) / 1e5, 0.0)
+
+        # Rods have no effect on the diffusion, absorption takes what fission loses
+        current_f = self.zone_f * reactivity_factor
+        current_a = self.zone_a + (self.zone_f - current_f)
+        total = current_a + current_f + self.zone_d
+
+        table = np.empty((2, len(self.zone_d), 2))
+        table[0, :, 0] = self.zone_d / (self.zone_a + self.zone_d)
+        table[0, :, 1] = np.inf                     # Only thermal neutrons fission
+        table[1, :, 0] = self.zone_d / total
+        table[1, :, 1] = (self.zone_d + current_a) / total
+        return table
+
+
+# ------------------------------------------------------------------
+# Same material on the whole grid (moderator of the configuration)
+# ------------------------------------------------------------------
+def uniform_map(n:int, m:int, material:Moderator):
+    return MaterialMap(n, m, [material])
+
+
+# ------------------------------------------------------------------
+# Read a material map file
+# ------------------------------------------------------------------
+# Format (see maps/reflected_core.txt), '#' starts a comment :
+#     [materials]
+#     <symbol> <name> [absorb diffuse fission slow_fast slow_epi]
+#     [rods]
+#     <rod id> <first row> <last row> <first column> <last column>
+#     [grid]
+#     one line of m symbols per row
+# A material without coefficients is taken from MODERATORS, 'none' is the bare material.
+# A rod can be listed on several lines, rods not listed act on the whole grid.
+def load_material_map(path:str, n:int, m:int, bare:Moderator):
+    # === 1. Split the sections ===
+    sections = {"materials" : [], "rods" : [], "grid" : []}
+    section = None
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            if line.startswith("["):
+                section = line.strip("[]").strip()
+                if section not in sections:
+                    raise ValueError(f"Unknown section [{section}] in {path}")
+            elif section is None:
+                raise ValueError(f"Line outside a section in {path}: {line}")
+            else:
+                sections[section].append(line)
+
+    # === 2. Materials ===
+    symbols, materials = {}, []
+    for line in sections["materials"]:
+        fields = line.split()
+        symbol, name = fields[0], fields[1]
+        if len(fields) == 7:
+            material = Moderator(name, *[float(v) for v in fields[2:]])
+        elif name == BARE:
+            material = bare
+        elif name in MODERATORS:
+            material = MODERATORS[name]
+        else:
+            raise ValueError(f"Material {name} needs its coefficients: absorb diffuse fission slow_fast slow_epi")
+        symbols[symbol] = len(materials)
+        materials.append(material)
+
+    # === 3. Layout ===
+    rows = ["".join(line.split()) for line in sections["grid"]]
+    if len(rows) != n or any(len(row) != m for row in rows):
+        raise ValueError(f"The grid of {path} must have {n} rows of {m} cells")
+    unknown = set("".join(rows)) - set(symbols)
+    if unknown:
+        raise ValueError(f"Unknown material symbols in {path}: {', '.join(sorted(unknown))}")
+    layout = np.array([[symbols[s] for s in row] for row in rows], dtype=np.int64)
+
+    # === 4. Rod regions ===
+    rod_regions = {}
+    for line in sections["rods"]:
+        rod_id, r0, r1, c0, c1 = line.split()
+        mask = rod_regions.setdefault(rod_id, np.zeros((n, m), dtype=bool))
+        mask[int(r0):int(r1) + 1, int(c0):int(c1) + 1] = True
+
+    return MaterialMap(n, m, materials, layout, rod_regions)
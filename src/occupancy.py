@@ -0,0 +1,195 @@
+# ==========================================================================================
+#                                    Occupancy Grid
+# ==========================================================================================
+
+import numpy as np
+
+
+class OccupancyGrid:
+    """
+        Number of neutrons of each type on each cell, as a (n_types, n, m) tensor. The
+        engine updates it once per step with a scatter-add, then the displays and the
+        spatial statistics read it instead of going through the neutrons again.
+    """
+
+    def __init__(self, n:int, m:int, n_types:int=3):
+        self.n, self.m, self.n_types = n, m, n_types
+        self.current = np.zeros((n_types, n, m), dtype=np.int64)   # Occupancy of the last step
+        self.total = np.zeros((n_types, n, m), dtype=np.int64)     # Occupancy summed over all steps
+        self.n_updates = 0
+
+
+    # ------------------------------------------------------------------
+    # Replace the current occupancy by the one of a new step
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - xs, ys : neutrons positions
+    #     - types : neutrons type codes (see population.TYPE_CODES)
+    def update(self, xs, ys, types):
+        self.current.fill(0)
+        np.add.at(self.current, (types, xs, ys), 1)
+        self.total += self.current
+        self.n_updates += 1
+
+
+    # ------------------------------------------------------------------
+    # Views used by the displays and statistics
+    # ------------------------------------------------------------------
+    # Number of neutrons on each cell, all types together
+    def counts(self):
+        return self.current.sum(axis=0)
+
+
+    # Type with the most neutrons on each cell (first type on ties)
+    def dominant_type(self):
+        return self.current.argmax(axis=0)
+
+
+    # Number of neutrons on each cell summed over all the steps
+    def cumulated_counts(self):
+        return self.total.sum(axis=0)
+
+
+    # ------------------------------------------------------------------
+    # Occupied cells only, as coordinates lists
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - types, xs, ys, counts arrays, one entry per occupied (type, cell)
+    def cells(self, cumulated:bool=False):
+        grid = self.total if cumulated else self.current
+        types, xs, ys = np.nonzero(grid)
+        return types, xs, ys, grid[types, xs, ys]
+
+
+    # ------------------------------------------------------------------
+    # Coarse grained views for the displays (see bin_cells)
+    # ------------------------------------------------------------------
+    def coarse_counts(self, shape=None, cumulated:bool=False):
+        if shape is None or tuple(shape) == (self.n, self.m):
+            return self.cumulated_counts() if cumulated else self.counts()
+        return bin_cells(*self.cells(cumulated), self.n, self.m, shape, self.n_types).sum(axis=0)
+
+
+    def coarse_dominant(self, shape=None):
+        if shape is None or tuple(shape) == (self.n, self.m):
+            return self.dominant_type()
+        return bin_cells(*self.cells(), self.n, self.m, shape, self.n_types).argmax(axis=0)
+
+
+class SparseOccupancy:
+    """
+        Same views as OccupancyGrid, for very large grids where only a few cells hold
+        neutrons. Occupied cells are hashed to a single integer key and stored as sorted
+        (key, count) arrays, so the memory follows the number of neutrons and not the
+        area of the grid. The steps are summed lazily : they are merged in the total once
+        the pending steps are as large as the total itself.
+    """
+
+    def __init__(self, n:int, m:int, n_types:int=3):
+        self.n, self.m, self.n_types = n, m, n_types
+        self.current_keys = np.zeros(0, dtype=np.int64)     # Keys of the occupied (type, cell) of the last step
+        self.current_counts = np.zeros(0, dtype=np.int64)
+        self.total_keys = np.zeros(0, dtype=np.int64)       # Same, summed over all steps
+        self.total_counts = np.zeros(0, dtype=np.int64)
+        self.pending = []                                   # Steps not merged in the total yet
+        self.n_pending = 0
+        self.n_updates = 0
+
+
+    # Key of a (type, cell) : cells are numbered row by row, then the type
+    def keys(self, xs, ys, types):
+        return (np.asarray(xs, dtype=np.int64) * self.m + ys) * self.n_types + types
+
+
+    def decode(self, keys):
+        cells, types = np.divmod(keys, self.n_types)
+        xs, ys = np.divmod(cells, self.m)
+        return types, xs, ys
+
+
+    def update(self, xs, ys, types):
+        self.current_keys, self.current_counts = np.unique(self.keys(xs, ys, types), return_counts=True)
+        self.pending.append((self.current_keys, self.current_counts))
+        self.n_pending += len(self.current_keys)
+        if self.n_pending > len(self.total_keys):
+            self.merge()
+        self.n_updates += 1
+
+
+    # ------------------------------------------------------------------
+    # Add the pending steps to the total
+    # ------------------------------------------------------------------
+    def merge(self):
+        if not self.pending:
+            return
+        keys = np.concatenate([self.total_keys] + [k for k, _ in self.pending])
+        counts = np.concatenate([self.total_counts] + [c for _, c in self.pending])
+        self.total_keys, inverse = np.unique(keys, return_inverse=True)
+        self.total_counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self.pending = []
+        self.n_pending = 0
+
+
+    def cells(self, cumulated:bool=False):
+        if cumulated:
+            self.merge()
+            return (*self.decode(self.total_keys), self.total_counts)
+        return (*self.decode(self.current_keys), self.current_counts)
+
+
+    # ------------------------------------------------------------------
+    # Dense views, only for grids small enough or coarse shapes
+    # ------------------------------------------------------------------
+    def counts(self):
+        return self.coarse_counts((self.n, self.m))
+
+
+    def dominant_type(self):
+        return self.coarse_dominant((self.n, self.m))
+
+
+    def cumulated_counts(self):
+        return self.coarse_counts((self.n, self.m), cumulated=True)
+
+
+    def coarse_counts(self, shape=None, cumulated:bool=False):
+        return bin_cells(*self.cells(cumulated), self.n, self.m, shape or (self.n, self.m), self.n_types).sum(axis=0)
+
+
+    def coarse_dominant(self, shape=None):
+        return bin_cells(*self.cells(), self.n, self.m, shape or (self.n, self.m), self.n_types).argmax(axis=0)
+
+
+# ------------------------------------------------------------------
+# Sum occupied cells into a coarse (rows, cols) grid of blocks
+# ------------------------------------------------------------------
+# Inputs:
+#     - types, xs, ys, counts : occupied cells (see cells)
+#     - n, m : size of the reactor grid
+#     - shape : (rows, cols) of the coarse grid, at most (n, m)
+#     - n_types : number of neutron types
+# Returns:
+#     - (n_types, rows, cols) array of counts
+def bin_cells(types, xs, ys, counts, n:int, m:int, shape, n_types:int=3):
+    rows, cols = shape
+    index = ((types * rows + xs * rows // n) * cols + ys * cols // m).astype(np.int64)
+    binned = np.bincount(index, weights=counts, minlength=n_types * rows * cols)
+    return binned.astype(np.int64).reshape(n_types, rows, cols)
+
+
+# ------------------------------------------------------------------
+# Shape of the coarse grid used to display a n x m reactor
+# ------------------------------------------------------------------
+def coarse_shape(n:int, m:int, max_cells:int):
+    return min(n, max_cells), min(m, max_cells)
+
+
+# ------------------------------------------------------------------
+# Create the occupancy chosen in the configuration
+# ------------------------------------------------------------------
+def make_occupancy(kind:str, n:int, m:int, n_types:int=3):
+    if kind == 'dense':
+        return OccupancyGrid(n, m, n_types)
+    if kind == 'sparse':
+        return SparseOccupancy(n, m, n_types)
+    raise ValueError("Occupancy not recognized. Choose between 'dense' or 'sparse'.")
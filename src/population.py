@@ -0,0 +1,118 @@
+# ==========================================================================================
+#                               Neutron Population (vectorized)
+# ==========================================================================================
+
+import numpy as np
+
+# Neutron types are stored as small integer codes, in the same order as ReactorV2.neutron_states
+FAST, THERMAL, EPITHERMAL = 0, 1, 2
+NEUTRON_TYPES = np.array(["fast", "thermal", "epithermal"])
+TYPE_CODES = {name : code for code, name in enumerate(NEUTRON_TYPES)}
+
+
+class NeutronPopulation:
+    """
+        Structure of arrays holding the whole neutron population of a reactor.
+        Each attribute of the Neutron class is stored in its own NumPy array so that
+        a simulation step can be applied to every neutron at once with masks.
+    """
+
+    def __init__(self, ids, xs, ys, types, speeds=None, ages=None, weights=None, generations=None):
+        size = len(ids)
+        self.id = np.asarray(ids, dtype=np.int64)
+        self.x = np.asarray(xs, dtype=np.int64)
+        self.y = np.asarray(ys, dtype=np.int64)
+        self.type = np.asarray(types, dtype=np.uint8)
+        self.speed = np.ones(size) if speeds is None else np.asarray(speeds, dtype=np.float64)
+        self.age = np.zeros(size, dtype=np.int64) if ages is None else np.asarray(ages, dtype=np.int64)
+        self.is_alive = np.ones(size, dtype=bool)
+        # Statistical weight, only changed by the weighted mode (see variance.py)
+        self.weight = np.ones(size) if weights is None else np.asarray(weights, dtype=np.float64)
+        # Number of fissions since the initial neutrons (see keff.py)
+        self.generation = np.zeros(size, dtype=np.int64) if generations is None else np.asarray(generations, dtype=np.int64)
+
+
+    # ------------------------------------------------------------------
+    # Build a population from a list of Neutron objects
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_neutrons(cls, neutrons:list):
+        return cls(
+            ids=[n.id for n in neutrons],
+            xs=[n.x for n in neutrons],
+            ys=[n.y for n in neutrons],
+            types=[TYPE_CODES[n.type] for n in neutrons],
+            speeds=[n.speed for n in neutrons],
+            ages=[n.age for n in neutrons],
+            generations=[n.generation for n in neutrons]
+        )
+
+
+    def __len__(self):
+        return len(self.id)
+
+
+    # ------------------------------------------------------------------
+    # Keep only the neutrons selected by a boolean mask (or an index array,
+    # repeated indices copy the neutrons)
+    # ------------------------------------------------------------------
+    def keep(self, mask):
+        self.id = self.id[mask]
+        self.x = self.x[mask]
+        self.y = self.y[mask]
+        self.type = self.type[mask]
+        self.speed = self.speed[mask]
+        self.age = self.age[mask]
+        self.is_alive = self.is_alive[mask]
+        self.weight = self.weight[mask]
+        self.generation = self.generation[mask]
+
+
+    # ------------------------------------------------------------------
+    # Insert another population in front of this one
+    # ------------------------------------------------------------------
+    def prepend(self, other):
+        self.id = np.concatenate((other.id, self.id))
+        self.x = np.concatenate((other.x, self.x))
+        self.y = np.concatenate((other.y, self.y))
+        self.type = np.concatenate((other.type, self.type))
+        self.speed = np.concatenate((other.speed, self.speed))
+        self.age = np.concatenate((other.age, self.age))
+        self.is_alive = np.concatenate((other.is_alive, self.is_alive))
+        self.weight = np.concatenate((other.weight, self.weight))
+        self.generation = np.concatenate((other.generation, self.generation))
+
+
+    # ------------------------------------------------------------------
+    # Create all the fission neutrons of a step in one go
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - parents : indices of the neutrons which made a fission
+    #     - n_new : number of neutrons produced by each of these fissions
+    #     - next_id : first free neutron id
+    # Returns:
+    #     - new population of fast neutrons, born on their parent cell with its weight,
+    #       in the generation after their parent
+    def offspring(self, parents, n_new, next_id:int):
+        parents = np.repeat(parents, n_new)
+        n_children = len(parents)
+        return NeutronPopulation(
+            ids=np.arange(next_id, next_id + n_children),
+            xs=self.x[parents],
+            ys=self.y[parents],
+            types=np.full(n_children, FAST),
+            weights=self.weight[parents],
+            generations=self.generation[parents] + 1
+        )
+
+
+    # ------------------------------------------------------------------
+    # Snapshot in the same format as the object based history
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - dictionary {id: (x, y, type)}
+    def snapshot(self):
+        return dict(zip(
+            self.id.tolist(),
+            zip(self.x.tolist(), self.y.tolist(), NEUTRON_TYPES[self.type].tolist())
+        ))
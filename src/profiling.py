@@ -0,0 +1,121 @@
+# ==========================================================================================
+#                                   Per Phase Profiling
+# ==========================================================================================
+
+import sys
+import time
+import numpy as np
+
+# Phases of ReactorV2.step, in the order of the loop
+PHASES = ("rods", "neutrons", "measure", "pilotage", "record")
+RODS, NEUTRONS, MEASURE, PILOTAGE, RECORD = range(len(PHASES))
+
+
+class PhaseProfiler:
+    """
+        Opt-in timers of the simulation loop. Each step is a row of preallocated arrays :
+        nanoseconds spent in every phase, neutrons updated, fissions and the net number
+        of memory blocks allocated during the step (sys.getallocatedblocks). A phase gets
+        the time elapsed since the previous lap, so a lap costs one perf_counter_ns.
+    """
+
+    def __init__(self, capacity:int=1024):
+        self.times = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.neutrons = np.zeros(capacity, dtype=np.float64)
+        self.fissions = np.zeros(capacity, dtype=np.float64)
+        self.allocations = np.zeros(capacity, dtype=np.int64)
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.size = 0               # Recorded steps, the current one is size - 1
+        self.last = 0               # Time of the last lap (ns)
+        self.blocks = 0             # Allocated blocks at the start of the step
+
+
+    def __len__(self):
+        return self.size
+
+
+    # ------------------------------------------------------------------
+    # Open the row of a step
+    # ------------------------------------------------------------------
+    def start_step(self, step:int, neutrons:float):
+        if self.size == len(self.steps):
+            self.grow()
+        self.steps[self.size] = step
+        self.neutrons[self.size] = neutrons
+        self.size += 1
+        self.blocks = sys.getallocatedblocks()
+        self.last = time.perf_counter_ns()
+
+
+    # Time since the previous lap goes to the phase
+    def lap(self, phase:int):
+        now = time.perf_counter_ns()
+        self.times[self.size - 1, phase] += now - self.last
+        self.last = now
+
+
+    # Counters of the step, the record phase can still be timed afterwards
+    def end_step(self, fissions:float):
+        row = self.size - 1
+        self.fissions[row] = fissions
+        self.allocations[row] = sys.getallocatedblocks() - self.blocks
+        self.last = time.perf_counter_ns()
+
+
+    # Double the capacity of the arrays
+    def grow(self):
+        capacity = max(2 * len(self.steps), 1)
+        for name in ("times", "neutrons", "fissions", "allocations", "steps"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+
+    # ------------------------------------------------------------------
+    # Recorded columns, one value per step
+    # ------------------------------------------------------------------
+    def columns(self):
+        data = {"step" : self.steps[:self.size]}
+        for phase, name in enumerate(PHASES):
+            data[f"{name}_ns"] = self.times[:self.size, phase]
+        data["neutrons"] = self.neutrons[:self.size]
+        data["fissions"] = self.fissions[:self.size]
+        data["allocated_blocks"] = self.allocations[:self.size]
+        return data
+
+
+    # ------------------------------------------------------------------
+    # Totals of the run
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - dictionary {phase: {"total_s", "mean_ms", "share"}} and the run totals
+    def summary(self):
+        times = self.times[:self.size]
+        total = int(times.sum())
+        phases = {}
+        for phase, name in enumerate(PHASES):
+            phase_total = int(times[:, phase].sum())
+            phases[name] = {
+                "total_s" : phase_total / 1e9,
+                "mean_ms" : phase_total / 1e6 / max(self.size, 1),
+                "share" : phase_total / total if total > 0 else 0.0
+            }
+        updates = float(self.neutrons[:self.size].sum())
+        return {
+            "steps" : self.size,
+            "total_s" : total / 1e9,
+            "phases" : phases,
+            "neutrons_per_s" : updates / (total / 1e9) if total > 0 else 0.0,
+            "fissions" : float(self.fissions[:self.size].sum()),
+            "allocated_blocks" : int(self.allocations[:self.size].sum())
+        }
+
+
+    def format_summary(self):
+        summary = self.summary()
+        lines = [f"Profile of {summary['steps']} steps : {summary['total_s']:.3f} s, {summary['neutrons_per_s']:.4g} neutrons/s"]
+        for name, phase in summary["phases"].items():
+            lines.append(f"    {name:<10} {phase['total_s']:>9.3f} s {phase['mean_ms']:>9.3f} ms/step {100 * phase['share']:>6.1f} %")
+        lines.append(f"    fissions {summary['fissions']:.0f}, net allocated blocks {summary['allocated_blocks']}")
+        return "\n".join(lines)
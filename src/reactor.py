@@ -2,14 +2,12 @@
 #                                 Nuclear Reactor Class
 # ==========================================================================================
 
-from matplotlib import pyplot as plt
 import numpy as np 
-from numpy import random as npr
-from rich.live import Live
-from rich.table import Table
 from time import sleep
 
 from utils import simul_poisson
+from occupancy import OccupancyGrid
+from sampling import make_rng
 
 class Reactor: 
 
@@ -29,6 +27,8 @@ class Reactor:
         self.toric = config['toric']
         self.history = [self.state]
         self.display = config['display']
+        self.rng = config.get('rng') or make_rng(config.get('seed'), config.get('bit_generator', 'PCG64'))
+        self.occupancy = OccupancyGrid(self.n, self.m, n_types=1)
 
     # Choose which action to perform for a neutron at each iteration
     # Inputs: 
@@ -40,7 +40,7 @@ class Reactor:
     def choose_action(self): 
         total = self.d + self.a + self.f
         d1, a1 = self.d/total, self.a/total
-        u = npr.rand()
+        u = self.rng.random()
         l = [d1, d1+a1, 1.0]
         x = 0
         while u > l[x]:
@@ -53,7 +53,7 @@ class Reactor:
     #     - ensures that dx and dy are not both zero (the neutron moves)
     def choose_direction(self): 
         while True :
-            dx, dy = npr.choice([-1, 0, 1]), npr.choice([-1, 0, 1])
+            dx, dy = self.rng.integers(-1, 2, 2)
             if dx != 0 or dy != 0 :
                 return dx, dy
 
@@ -77,8 +77,8 @@ class Reactor:
         # Diffusion
         if action == 0:
             dx, dy = self.choose_direction()
-            step_x = dx * npr.randint(1, self.max_speed+1)
-            step_y = dy * npr.randint(1, self.max_speed+1)
+            step_x = dx * self.rng.integers(1, self.max_speed+1)
+            step_y = dy * self.rng.integers(1, self.max_speed+1)
             new_x = x + step_x
             new_y = y + step_y
             new_pos = (new_x, new_y)
@@ -89,9 +89,9 @@ class Reactor:
 
         # Fission
         elif action == 2:
-            n_new = simul_poisson(self.l)
+            n_new = simul_poisson(self.l, self.rng)
             for _ in range(n_new):
-                dx, dy = (npr.choice([-1,1]), npr.choice([-1,1]))
+                dx, dy = self.rng.choice([-1, 1], 2)
                 nx = x + dx 
                 ny = y + dy 
                 if self.is_in_the_grid(nx, ny): 
@@ -161,19 +161,21 @@ class Reactor:
     #     - n, m : size of the grid
     #     - state : dictionary containing neutron positions {id: (x,y)}
     # Returns:
-    #     - grid : 2D array (list of lists) representing the current neutron positions
+    #     - grid : 2D array representing the current neutron positions
     def build_grid(self):
-        grid = [[0 for _ in range(self.m)] for _ in range(self.n)]
-        for neutron, (x, y) in self.state.items():
-            grid[x][y] += 1
-        self.grid = grid 
+        positions = np.array(list(self.state.values()), dtype=np.int64).reshape(-1, 2)
+        self.occupancy.update(positions[:, 0], positions[:, 1], np.zeros(len(positions), dtype=np.int64))
+        self.grid = self.occupancy.counts()
     
     def display_reactor(self):
+        # The display is the only user of rich
+        from rich.table import Table
+
         # Build grid 
         self.build_grid()
         # Create the corresponding table 
         table = Table(show_header=False, show_lines=True)
-        for line in self.grid:
+        for line in self.grid.tolist():
             table.add_row(*[str(x) if x > 0 else ' ' for x in line])
         self.live.update(table)
         sleep(0.2)
@@ -0,0 +1,214 @@
+# ==========================================================================================
+#                                   Random Sampling Tools
+# ==========================================================================================
+
+import numpy as np
+
+# The 8 possible moves of a diffusing neutron (the neutron can't stay on its cell)
+DIRECTIONS = np.array([
+    (-1, -1), (-1, 0), (-1, 1),
+    ( 0, -1),          ( 0, 1),
+    ( 1, -1), ( 1, 0), ( 1, 1)
+])
+
+
+# Bit generators which can be chosen in the configuration
+BIT_GENERATORS = {
+    "PCG64" : np.random.PCG64,
+    "PCG64DXSM" : np.random.PCG64DXSM,
+    "Philox" : np.random.Philox
+}
+
+
+# ------------------------------------------------------------------
+# Create the random generator of a simulation
+# ------------------------------------------------------------------
+# Inputs:
+#     - seed : int, SeedSequence or None (fresh entropy)
+#     - bit_generator : name of the bit generator, see BIT_GENERATORS
+# Returns:
+#     - numpy.random.Generator
+def make_rng(seed=None, bit_generator:str="PCG64"):
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError(f"Unknown bit generator: {bit_generator}. Choose between {', '.join(BIT_GENERATORS)}.")
+    return np.random.Generator(BIT_GENERATORS[bit_generator](seed))
+
+
+# ------------------------------------------------------------------
+# Independent stream obtained by jumping ahead in the generator sequence
+# ------------------------------------------------------------------
+# Inputs:
+#     - rng : numpy.random.Generator
+#     - jumps : number of jumps (each jump is 2^127 draws for PCG64, 2^128 for Philox)
+def jumped_rng(rng, jumps:int=1):
+    return np.random.Generator(rng.bit_generator.jumped(jumps))
+
+
+# ------------------------------------------------------------------
+# Generator state as JSON compatible values (for the checkpoints)
+# ------------------------------------------------------------------
+def get_rng_state(rng):
+    return _encode_state(rng.bit_generator.state)
+
+
+def set_rng_state(rng, state:dict):
+    rng.bit_generator.state = _decode_state(state)
+
+
+def _encode_state(value):
+    if isinstance(value, dict):
+        return {key : _encode_state(v) for key, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__" : value.tolist(), "dtype" : str(value.dtype)}
+    return value
+
+
+def _decode_state(value):
+    if isinstance(value, dict):
+        if "__ndarray__" in value:
+            return np.array(value["__ndarray__"], dtype=value["dtype"])
+        return {key : _decode_state(v) for key, v in value.items()}
+    return value
+
+
+class UniformBlock:
+    """
+        Pre-generate uniform random numbers by large blocks and serve them on demand.
+        Drawing once per block avoids paying the NumPy call overhead for every neutron.
+    """
+
+    def __init__(self, rng, block_size:int=65536):
+        self.rng = rng                  # numpy.random.Generator
+        self.block_size = block_size
+        self.refill()
+
+
+    def refill(self):
+        self.buffer = self.rng.random(self.block_size)
+        self.pos = 0
+
+
+    # ------------------------------------------------------------------
+    # Draw a single uniform number in [0, 1)
+    # ------------------------------------------------------------------
+    def next(self):
+        if self.pos >= self.block_size:
+            self.refill()
+        u = self.buffer[self.pos]
+        self.pos += 1
+        return float(u)
+
+
+    # ------------------------------------------------------------------
+    # Draw an array of uniform numbers in [0, 1)
+    # ------------------------------------------------------------------
+    def take(self, size:int):
+        if size > self.block_size:
+            return self.rng.random(size)
+        if self.pos + size > self.block_size:
+            self.refill()
+        u = self.buffer[self.pos:self.pos + size]
+        self.pos += size
+        return u
+
+
+    # ------------------------------------------------------------------
+    # Draw integers uniformly in [low, high) from the uniform block
+    # ------------------------------------------------------------------
+    def integers(self, low:int, high:int, size:int):
+        return low + (self.take(size) * (high - low)).astype(np.int64)
+
+
+class ActionSampler:
+    """
+        Choose neutron actions and diffusion directions. The action thresholds only
+        depend on the reactor probabilities, so they are computed once per step with
+        set_probabilities and then shared by every neutron of the step.
+    """
+
+    def __init__(self, rng, block_size:int=65536):
+        self.block = UniformBlock(rng, block_size)
+        self.set_probabilities(0.0, 0.0, 0.0, 1.0)
+
+
+    # ------------------------------------------------------------------
+    # Precompute the cumulative distribution of the actions
+    # 0 for diffusion, 1 for absorption, 2 for fission
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - current_a : absorption probability of thermal neutrons
+    #     - current_f : fission probability of thermal neutrons
+    #     - base_a : absorption probability of the other neutrons
+    #     - base_d : diffusion probability
+    def set_probabilities(self, current_a:float, current_f:float, base_a:float, base_d:float):
+        total = current_a + current_f + base_d
+        self.thermal_d = base_d / total
+        self.thermal_da = (base_d + current_a) / total
+        self.other_d = base_d / (base_a + base_d)
+
+
+    # ------------------------------------------------------------------
+    # Single neutron draws (object engine)
+    # ------------------------------------------------------------------
+    def thermal_action(self):
+        u = self.block.next()
+        if u < self.thermal_d:
+            return 0
+        elif u < self.thermal_da:
+            return 1
+        return 2
+
+
+    def other_action(self):
+        if self.block.next() < self.other_d:
+            return 0
+        return 1
+
+
+    def uniform(self):
+        return self.block.next()
+
+
+    # Action from the (diffusion, absorption) cumulated probabilities of a cell
+    def action_between(self, threshold_d:float, threshold_a:float):
+        u = self.block.next()
+        if u < threshold_d:
+            return 0
+        elif u < threshold_a:
+            return 1
+        return 2
+
+
+    def direction(self):
+        dx, dy = DIRECTIONS[int(self.block.next() * 8)]
+        return int(dx), int(dy)
+
+
+    def step_length(self, max_speed:int):
+        return 1 + int(self.block.next() * max_speed)
+
+
+    # ------------------------------------------------------------------
+    # Whole population draws (vectorized engine)
+    # ------------------------------------------------------------------
+    # Input:
+    #     - thresholds : (size, 2) array of (diffusion, absorption) cumulated probabilities
+    #       of each neutron, e.g. gathered from a material map
+    # Returns:
+    #     - array of actions, 0 for diffusion, 1 for absorption, 2 for fission
+    def actions_at(self, thresholds):
+        u = self.block.take(len(thresholds))
+        return (u >= thresholds[:, 0]).astype(np.int64) + (u >= thresholds[:, 1])
+
+
+    def uniforms(self, size:int):
+        return self.block.take(size)
+
+
+    def directions(self, size:int):
+        moves = DIRECTIONS[self.block.integers(0, 8, size)]
+        return moves[:, 0], moves[:, 1]
+
+
+    def step_lengths(self, max_speed:int, size:int):
+        return self.block.integers(1, max_speed + 1, size)
@@ -3,9 +3,13 @@
 # ==========================================================================================
 
 import numpy as np 
-from rich.live import Live
 from ReactorV2 import ReactorV2
-from matplotlib import pyplot as plt
+from history import HistoryStore, population_counts
+from ensemble import run_ensemble
+from occupancy import bin_cells, coarse_shape
+
+# matplotlib is imported by the plot functions only, the extinction statistics
+# can run on nodes without a display
 
 # ==========================================================================================
 #                          Visualization and Statistical Analysis Tools
@@ -23,16 +27,15 @@ def get_trajectories(history):
 # Calculate the nb of neutrons by generations
 # --------------------------------------------
 def get_neutrons_count(history): 
-    n_neutrons = []
-    for period in history: 
-        n_neutrons.append(len(period))
-    return n_neutrons
+    return population_counts(history)
 
 
 # --------------------------------------------
 # Plot the Number of Neutrons per Generation
 # --------------------------------------------
 def plot_neutron_count(history): 
+    from matplotlib import pyplot as plt
+
     n_neutrons = get_neutrons_count(history)
     plt.plot([i for i in range(len(n_neutrons))], n_neutrons)
     plt.title("Number of Neutrons per Generation")
@@ -41,23 +44,64 @@ def plot_neutron_count(history):
     plt.show()
 
 
+# Growth of the population between two time steps (not a generation k, see plot_keff)
 def plot_k_value(history): 
+    from matplotlib import pyplot as plt
+
     n_neutrons = get_neutrons_count(history)
-    plt.plot([i for i in range(len(n_neutrons) -1)], [n_neutrons[i] / n_neutrons[i+1] for i in range(len(n_neutrons) - 1)])
+    steps = [i for i in range(len(n_neutrons) - 1) if n_neutrons[i] > 0]
+    plt.plot(steps, [n_neutrons[i+1] / n_neutrons[i] for i in steps])
+    plt.xlabel("Steps")
+    plt.ylabel("n(t+1) / n(t)")
+    plt.title("Population growth ratio by step")
+    plt.show()
+
+
+# --------------------------------------------
+# Plot the k-effective of each generation
+# --------------------------------------------
+# Input: 
+#     - keff : keff.KeffEstimator of a run (reactor.keff)
+def plot_keff(keff): 
+    from matplotlib import pyplot as plt
+
+    generations = np.arange(len(keff.k_generations))
+    plt.plot(generations, keff.k_generations, '.', alpha=0.5, label="k of the generation")
+
+    # Running mean of the active batches, with one standard error
+    means, errors = keff.running()
+    if len(means) > 0:
+        batch_end = keff.n_inactive + keff.batch_size * np.arange(1, len(means) + 1) - 1
+        plt.plot(batch_end, means, color='red', label="running mean")
+        plt.fill_between(batch_end, means - errors, means + errors, color='red', alpha=0.2, where=np.isfinite(errors))
+    plt.axvline(keff.n_inactive - 0.5, color='grey', linestyle='--', label="inactive / active")
     plt.xlabel("Generations")
-    plt.ylabel("k values")
-    plt.title("k value evolution by generation")
+    plt.ylabel("k-eff")
+    plt.title(f"k-eff = {keff.mean():.4f} +/- {keff.std_error():.4f}")
+    plt.legend()
     plt.show()
 
 
 # -------------------------------------------
 # Plot the Spatial Distribution of Neutrons
 # -------------------------------------------
-def plot_spatial_distribution(config, history): 
-    grid_sum = np.zeros((config['n'], config['m']))
-    for state in history:
-        for id in state: 
-            grid_sum[state[id][0],state[id][1]] += 1 
+# The cumulated occupancy of the reactor (reactor.occupancy) is used when given
+# Large grids are summed by blocks, on at most max_cells x max_cells bins
+def plot_spatial_distribution(config, history, occupancy=None, max_cells=500): 
+    from matplotlib import pyplot as plt
+
+    n, m = config['n'], config['m']
+    shape = coarse_shape(n, m, max_cells)
+    if occupancy is not None:
+        grid_sum = occupancy.coarse_counts(shape, cumulated=True)
+    else:
+        if isinstance(history, HistoryStore):
+            _, _, xs, ys, _ = history.columns()
+        else:
+            positions = np.array([p[:2] for state in history for p in state.values()], dtype=np.int64).reshape(-1, 2)
+            xs, ys = positions[:, 0], positions[:, 1]
+        ones = np.ones(len(xs), dtype=np.int64)
+        grid_sum = bin_cells(np.zeros(len(xs), dtype=np.int64), xs, ys, ones, n, m, shape, n_types=1)[0]
 
     plt.imshow(grid_sum, cmap='hot', origin='lower')
     plt.colorbar(label='Occupation Frequency')
@@ -71,14 +115,20 @@ def plot_spatial_distribution(config, history):
 # Plot Individual Neutron Trajectories
 # ---------------------------------------
 def plot_trajectories(history, n_traj=5):
-    trajectories = {i: [] for i in list(history[0].keys())[:n_traj]}
-    for state in history:
-        for i in trajectories:
-            if i in state:
-                trajectories[i].append(state[i])
+    from matplotlib import pyplot as plt
+
+    if isinstance(history, HistoryStore):
+        first_ids, _, _, _ = history.snapshot(0)
+        trajectories = history.trajectories(first_ids[:n_traj].tolist())
+    else:
+        trajectories = {i: [] for i in list(history[0].keys())[:n_traj]}
+        for state in history:
+            for i in trajectories:
+                if i in state:
+                    trajectories[i].append(state[i][:2])
+        trajectories = {i: tuple(zip(*traj)) for i, traj in trajectories.items()}
     plt.figure()
-    for i, traj in trajectories.items():
-        xs, ys = zip(*traj)
+    for i, (xs, ys) in trajectories.items():
         plt.plot(xs, ys, marker='.')
     plt.xlabel('x')
     plt.ylabel('y')
@@ -94,30 +144,18 @@ def plot_trajectories(history, n_traj=5):
 # ---------------------------------------
 # Estimate the Extinction Probability
 # ---------------------------------------
-def extinction_probability(config, n_runs=20): 
-    extinct = 0 
-    for _ in range(n_runs): 
-        reactor = ReactorV2(None, config)
-        history = reactor.simulate()
-        if len(history[-1]) == 0: 
-            extinct += 1
-    return extinct / n_runs 
+# Replicas run in parallel, see ensemble.run_ensemble for the confidence intervals
+def extinction_probability(config, n_runs=20, n_workers=None, seed=None): 
+    ensemble = run_ensemble(config, n_runs, seed=seed, n_workers=n_workers)
+    return ensemble.extinction_probability()
 
 
 # ---------------------------------------
 # Compute the Mean Time to Extinction
 # ---------------------------------------
-def mean_times_to_extinction(config, n_runs=20): 
-    times = []
-    for _ in range(n_runs): 
-        reactor = ReactorV2(None, config)
-        history = reactor.simulate()
-        # Get the extinction time 
-        for t,state in enumerate(history): 
-            if len(state) == 0:
-                times.append(t)
-                break 
-    return np.mean(times) if times else np.inf
+def mean_times_to_extinction(config, n_runs=20, n_workers=None, seed=None): 
+    ensemble = run_ensemble(config, n_runs, seed=seed, n_workers=n_workers)
+    return ensemble.mean_time_to_extinction()
 
 
 # ---------------------------------------
@@ -127,35 +165,40 @@ def plot_infos(config, n_runs=20):
     reactor = ReactorV2(None, config)
     history = reactor.simulate()
     plot_neutron_count(history)
-    plot_spatial_distribution(config, history)
+    plot_spatial_distribution(config, history, reactor.occupancy)
     plot_k_value(history)
+    if reactor.keff is not None:
+        plot_keff(reactor.keff)
 
 
 # ---------------------------------------
 # Run the Experiment
 # ---------------------------------------
 
-# Configuration parameters for a class II Reactor
-config = {
-    'n' : 15, 
-    'm' : 15, 
-    'n_initial' : 10, 
-    'd' : 0.5,
-    'a' : 0.1,
-    'f' : 0.6,
-    'l' : 3,
-    'n_iter' : 100, 
-    'max_speed' : 2, 
-    'toric' : False, 
-    'display' : True, 
-    'colorized' : True, 
-    'thermalization_probs': {'fast_to_epi': 0.5, 'epi_to_thermal': 0.5}, 
-    'moderator' : 'graphite', 
-    'verbose' : True
-}
-
-with Live(refresh_per_second=10) as live: 
-    reactorV2 = ReactorV2(live, config)
-    history = reactorV2.simulate()
-
-plot_infos(config)
\ No newline at end of file
+if __name__ == "__main__":
+    from rich.live import Live
+
+    # Configuration parameters for a class II Reactor
+    config = {
+        'n' : 15, 
+        'm' : 15, 
+        'n_initial' : 10, 
+        'd' : 0.5,
+        'a' : 0.1,
+        'f' : 0.6,
+        'l' : 3,
+        'n_iter' : 100, 
+        'max_speed' : 2, 
+        'toric' : False, 
+        'display' : True, 
+        'colorized' : True, 
+        'thermalization_probs': {'fast_to_epi': 0.5, 'epi_to_thermal': 0.5}, 
+        'moderator' : 'graphite', 
+        'verbose' : True
+    }
+
+    with Live(refresh_per_second=10) as live: 
+        reactorV2 = ReactorV2(live, config)
+        history = reactorV2.simulate()
+
+    plot_infos(config)
\ No newline at end of file
@@ -0,0 +1,236 @@
+# ==========================================================================================
+#                              Streaming Trajectory Export
+# ==========================================================================================
+
+import csv
+import os
+import queue
+import threading
+import numpy as np
+
+from population import NEUTRON_TYPES
+
+FORMATS = ("npz", "parquet", "csv")
+
+
+class TrajectoryStreamer:
+    """
+        Export the neutrons trajectories while the simulation is running. Rows are buffered
+        until a chunk is full, then the chunk is written by a background thread so that the
+        simulation goes on during the I/O. The queue between both is bounded, which bounds
+        the memory used by the export.
+    """
+
+    def __init__(self, path:str, format:str="npz", chunk_rows:int=500_000, max_pending:int=4, background:bool=True):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown export format: {format}. Choose between {', '.join(FORMATS)}.")
+
+        self.path = path                # Prefix of the output file(s), without extension
+        self.format = format
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.n_chunks = 0
+        self.files = []
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        # Rows of the chunk being filled
+        self.pending = []
+        self.pending_rows = 0
+
+        # Format specific writers, opened on the first chunk
+        self.csv_file = None
+        self.parquet_writer = None
+
+        # Background writer
+        self.error = None
+        self.queue = queue.Queue(maxsize=max_pending) if background else None
+        self.thread = None
+        if background:
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+
+    # ------------------------------------------------------------------
+    # Add the neutrons of a step
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - step : time step of the snapshot
+    #     - ids, xs, ys : arrays of the neutrons ids and positions
+    #     - types : array of neutron type codes (see population.TYPE_CODES)
+    def write(self, step:int, ids, xs, ys, types):
+        size = len(ids)
+        self.pending.append((
+            np.full(size, step, dtype=np.int32),
+            np.array(ids, dtype=np.int64),
+            np.array(xs, dtype=np.int32),
+            np.array(ys, dtype=np.int32),
+            np.array(types, dtype=np.uint8)
+        ))
+        self.pending_rows += size
+        if self.pending_rows >= self.chunk_rows:
+            self.flush()
+
+
+    # ------------------------------------------------------------------
+    # Send the chunk being filled to the writer
+    # ------------------------------------------------------------------
+    def flush(self):
+        if self.error is not None:
+            raise self.error
+        if self.pending_rows == 0:
+            return
+        chunk = [np.concatenate(column) for column in zip(*self.pending)]
+        self.n_rows += self.pending_rows
+        self.pending = []
+        self.pending_rows = 0
+
+        if self.queue is None:
+            self._write_chunk(chunk)
+        else:
+            # Blocks when the writer is late, so memory stays bounded
+            self.queue.put(chunk)
+
+
+    # ------------------------------------------------------------------
+    # Write the rows of the past steps to disk (before a checkpoint)
+    # ------------------------------------------------------------------
+    # Returns:
+    #     - state of the export, given to restore when the run is resumed
+    def sync(self):
+        self.flush()
+        if self.queue is not None:
+            self.queue.join()
+        if self.error is not None:
+            raise self.error
+        csv_bytes = 0
+        if self.csv_file is not None:
+            self.csv_file.flush()
+            csv_bytes = self.csv_file.tell()
+        return {
+            "path" : self.path, "format" : self.format, "n_rows" : self.n_rows,
+            "n_chunks" : self.n_chunks, "files" : list(self.files), "csv_bytes" : csv_bytes
+        }
+
+
+    # ------------------------------------------------------------------
+    # Continue the files of an export saved by sync
+    # ------------------------------------------------------------------
+    # What was written after the checkpoint belongs to the interrupted run and is
+    # removed : npz shards beyond the saved ones, csv rows beyond the saved size, and
+    # the whole file when nothing was written before the checkpoint.
+    # A parquet file cannot be reopened, the resumed export must use a new path.
+    def restore(self, state:dict):
+        if state["n_chunks"] > 0 and self.format == "parquet":
+            raise ValueError(
+                f"Cannot resume the parquet export {state['files'][0]}: a parquet file cannot be appended. "
+                "Resume with a new 'trajectory_export' path, or use the 'npz' or 'csv' format."
+            )
+        self.n_rows = state["n_rows"]
+        self.n_chunks = state["n_chunks"]
+        self.files = list(state["files"])
+
+        if self.format == "npz":
+            folder = os.path.dirname(self.path) or "."
+            prefix = os.path.basename(self.path) + "_"
+            for shard in os.listdir(folder):
+                if shard.startswith(prefix) and shard.endswith(".npz") and shard[len(prefix):-4].isdigit() and int(shard[len(prefix):-4]) >= self.n_chunks:
+                    os.remove(os.path.join(folder, shard))
+        elif self.n_chunks > 0:
+            # Append after the rows of the checkpoint, the header is already written
+            self.csv_file = open(self.files[-1], "r+", newline="")
+            self.csv_file.truncate(state["csv_bytes"])
+            self.csv_file.seek(0, os.SEEK_END)
+        elif os.path.exists(f"{self.path}.{self.format}"):
+            os.remove(f"{self.path}.{self.format}")
+
+
+    # ------------------------------------------------------------------
+    # Write the last rows and wait for the writer
+    # ------------------------------------------------------------------
+    def close(self):
+        self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+        if self.error is not None:
+            raise self.error
+
+
+    def _worker(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                self.queue.task_done()
+                return
+            if self.error is None:
+                try:
+                    self._write_chunk(chunk)
+                except Exception as error:
+                    self.error = error
+            self.queue.task_done()
+
+
+    def _write_chunk(self, chunk:list):
+        steps, ids, xs, ys, types = chunk
+
+        # === NPZ : one compressed shard per chunk ===
+        if self.format == "npz":
+            shard_path = f"{self.path}_{self.n_chunks:05d}.npz"
+            np.savez_compressed(shard_path, time_step=steps, neutron_id=ids, x=xs, y=ys, type=types, type_names=NEUTRON_TYPES)
+            self.files.append(shard_path)
+
+        # === Parquet : one file, one row group per chunk ===
+        elif self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.table({
+                "time_step": steps,
+                "neutron_id": ids,
+                "x": xs,
+                "y": ys,
+                "type": pa.DictionaryArray.from_arrays(types, NEUTRON_TYPES.tolist())
+            })
+            if self.parquet_writer is None:
+                self.files.append(f"{self.path}.parquet")
+                self.parquet_writer = pq.ParquetWriter(self.files[-1], table.schema)
+            self.parquet_writer.write_table(table)
+
+        # === CSV : same layout as utils.export_neutrons_traj ===
+        else:
+            if self.csv_file is None:
+                self.files.append(f"{self.path}.csv")
+                self.csv_file = open(self.files[-1], "w", newline="")
+                csv.writer(self.csv_file).writerow(["time_step", "neutron_id", "x", "y", "type"])
+            csv.writer(self.csv_file).writerows(zip(
+                steps.tolist(), ids.tolist(), xs.tolist(), ys.tolist(), NEUTRON_TYPES[types].tolist()
+            ))
+
+        self.n_chunks += 1
+
+
+# ------------------------------------------------------------------
+# Read back the NPZ shards of a streamed export
+# ------------------------------------------------------------------
+# Returns:
+#     - dictionary of columns : time_step, neutron_id, x, y, type
+def load_npz_shards(path:str):
+    folder = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + "_"
+    shards = sorted(f for f in os.listdir(folder) if f.startswith(prefix) and f.endswith(".npz"))
+    columns = {name : [] for name in ("time_step", "neutron_id", "x", "y", "type")}
+    for shard in shards:
+        with np.load(os.path.join(folder, shard)) as data:
+            for name in columns:
+                columns[name].append(data[name])
+    return {name : np.concatenate(parts) if parts else np.empty(0) for name, parts in columns.items()}
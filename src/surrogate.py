@@ -0,0 +1,280 @@
+# ==========================================================================================
+#                                 Point Kinetics Surrogate
+# ==========================================================================================
+
+import time
+import numpy as np
+
+from ReactorV2 import ReactorV2
+from telemetry import EventChannel
+from population import FAST, EPITHERMAL, THERMAL
+
+# Order of the energy groups in Trace.groups and in the surrogate state
+GROUPS = (FAST, EPITHERMAL, THERMAL)
+
+
+class Trace:
+    """
+        Neutrons, fissions, power and temperature of a run, one value per step. The
+        neutrons are counted at the start of each step, groups splits them in (fast,
+        epithermal, thermal) and rho is the rods reactivity (pcm) used during the step.
+    """
+
+    def __init__(self, neutrons, fissions, rho, power, temperature, dt:float, wall_time:float=0.0, groups=None):
+        self.neutrons = np.asarray(neutrons, dtype=np.float64)
+        self.fissions = np.asarray(fissions, dtype=np.float64)
+        self.rho = np.asarray(rho, dtype=np.float64)
+        self.power = np.asarray(power, dtype=np.float64)
+        self.temperature = np.asarray(temperature, dtype=np.float64)
+        self.dt = dt
+        self.wall_time = wall_time
+        self.groups = None if groups is None else np.asarray(groups, dtype=np.float64)
+
+
+# ------------------------------------------------------------------
+# Rods reactivity of a reactor (or of a Plant), in pcm
+# ------------------------------------------------------------------
+def rods_reactivity_pcm(reactor):
+    if not reactor.rod_active:
+        return 0.0
+    return reactor.rod_bank.total_reactivity_pcm()
+
+
+# Neutrons of each energy group, weighted in the weighted mode
+def group_counts(reactor):
+    _, _, _, types = reactor.get_state_arrays()
+    counts = np.bincount(types, weights=reactor.get_weights(), minlength=len(GROUPS))
+    return counts[list(GROUPS)]
+
+
+# ------------------------------------------------------------------
+# Record the trace of a Monte Carlo run
+# ------------------------------------------------------------------
+# The run goes on after an extinction so that every trace has n_iter steps
+def record_trace(config:dict, seed=None):
+    start = time.perf_counter()
+    reactor = ReactorV2(None, dict(config, seed=seed, rng=None, display=False, verbose=False, quiet=True, trajectory_export=None))
+    neutrons, fissions, rho, groups = [], [], [], []
+    for _ in range(reactor.n_iter):
+        neutrons.append(reactor.estimated_neutrons())
+        groups.append(group_counts(reactor))
+        rho.append(rods_reactivity_pcm(reactor))
+        reactor.step()
+        fissions.append(reactor.n_fissions)
+    return Trace(neutrons, fissions, rho, reactor.power_history[1:], reactor.temp_history[1:], reactor.dt, time.perf_counter() - start, groups)
+
+
+class Plant:
+    """
+        Power, temperature and control rods of a ReactorV2, without neutrons. The state
+        is set by ReactorV2.init_plant and a step is ReactorV2.advance_plant, so the
+        controller and the protections are the reactor code, with the events off.
+    """
+
+    init_plant = ReactorV2.init_plant
+    advance_plant = ReactorV2.advance_plant
+    update_power_level = ReactorV2.update_power_level
+    update_temperature = ReactorV2.update_temperature
+    update_automatic_control_rods = ReactorV2.update_automatic_control_rods
+    check_emergency_scram = ReactorV2.check_emergency_scram
+
+    def __init__(self, config:dict):
+        self.n_iter = config['n_iter']
+        self.events = EventChannel(level="off", echo=False)
+        self.profiler = None
+        self.iteration = 0
+        self.init_plant(config)
+
+
+    # One step of the plant for the fissions of the step
+    def step(self, n_fissions:float):
+        self.iteration += 1
+        self.events.step = self.iteration
+        self.n_fissions = n_fissions
+        self.advance_plant()
+        self.rod_history.append({rod.id : rod.position_percent for rod in self.control_rods})
+
+
+class PointKinetics:
+    """
+        Reduced order model of ReactorV2 : point kinetics (no space) with the three energy
+        groups of the neutrons, so that the thermalization delay between a fission and
+        the fissions of its neutrons is kept. Each step, in expectation :
+            fast'    = s_fast * fast + nu * F
+            epi'     = p_epi * fast + s_epi * epi
+            thermal' = p_thermal * epi + (s_thermal + s_rho * rho) * thermal
+            F        = (yield_0 + yield_rho * rho) * thermal
+        where rho is the rods reactivity (pcm) and F the fissions of the step. Power,
+        temperature and rods come from the ReactorV2 plant code (see Plant).
+
+        Measured on the main.py configuration (heavy water, 300 steps, fitted on 3 runs
+        and compared with the mean of 3 other runs, 6 pairs of seeds) : power relative
+        RMSE 22 to 75 % (36 % on average), temperature largest error 70 to 390 K, inside
+        the Monte Carlo 2 sigma band on 80 to 87 % of the steps for the power and 63 to
+        89 % for the temperature. A step costs about 30 us, 15 to 25 times less than a
+        Monte Carlo step of this core. The runs hold about 100 neutrons : the largest
+        errors come from runs dying out and from the noise around the runback band,
+        which this mean-field model does not reproduce.
+    """
+
+    def __init__(self, coefficients:dict, dt:float, initial_groups):
+        self.coefficients = coefficients        # s_fast, nu, p_epi, s_epi, p_thermal, s_thermal, s_rho, yield_0, yield_rho
+        self.dt = dt
+        self.initial_groups = np.asarray(initial_groups, dtype=np.float64)   # Mean (fast, epi, thermal) at step 0
+
+
+    # ------------------------------------------------------------------
+    # Point kinetics parameters, rods withdrawn by default
+    # ------------------------------------------------------------------
+    # k_eff : fissions neutrons of the next generation for one fission neutron
+    def k_eff(self, rho:float=0.0):
+        c = self.coefficients
+        s_thermal = c["s_thermal"] + c["s_rho"] * rho
+        if max(c["s_fast"], c["s_epi"], s_thermal) >= 1.0:
+            return float("nan")
+        to_epi = c["p_epi"] / (1.0 - c["s_fast"])
+        to_thermal = c["p_thermal"] / (1.0 - c["s_epi"])
+        fissions = (c["yield_0"] + c["yield_rho"] * rho) / (1.0 - s_thermal)
+        return c["nu"] * to_epi * to_thermal * fissions
+
+
+    # Mean time between the birth of a neutron and its fissions (s)
+    def generation_time(self, rho:float=0.0):
+        c = self.coefficients
+        s_thermal = c["s_thermal"] + c["s_rho"] * rho
+        if max(c["s_fast"], c["s_epi"], s_thermal) >= 1.0:
+            return float("nan")
+        steps = 1.0 / (1.0 - c["s_fast"]) + 1.0 / (1.0 - c["s_epi"]) + s_thermal / (1.0 - s_thermal)
+        return steps * self.dt
+
+
+    # ------------------------------------------------------------------
+    # Simulate power, temperature and rods
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - config : ReactorV2 configuration (rods, controller, thermal settings)
+    # Returns:
+    #     - Trace of the surrogate run, and the Plant (rod_history, scram_triggered, ...)
+    def simulate(self, config:dict):
+        start = time.perf_counter()
+        c = self.coefficients
+        plant = Plant(config)
+        fast, epi, thermal = self.initial_groups.tolist()
+        neutrons, fissions, rho, groups = [], [], [], []
+        for _ in range(plant.n_iter):
+            rho_t = rods_reactivity_pcm(plant)
+            f = max(c["yield_0"] + c["yield_rho"] * rho_t, 0.0) * thermal
+            neutrons.append(fast + epi + thermal)
+            groups.append((fast, epi, thermal))
+            rho.append(rho_t)
+            fissions.append(f)
+
+            plant.step(f)
+            fast, epi, thermal = (
+                c["s_fast"] * fast + c["nu"] * f,
+                c["p_epi"] * fast + c["s_epi"] * epi,
+                c["p_thermal"] * epi + max(c["s_thermal"] + c["s_rho"] * rho_t, 0.0) * thermal
+            )
+
+        trace = Trace(neutrons, fissions, rho, plant.power_history[1:], plant.temp_history[1:], plant.dt, time.perf_counter() - start, groups)
+        return trace, plant
+
+
+# ------------------------------------------------------------------
+# Weighted least squares of y on the columns of x (no intercept)
+# ------------------------------------------------------------------
+# The rho columns are dropped (coefficient 0) when the rods never moved
+def _least_squares(columns:dict, y, weights):
+    names = [name for name, x in columns.items() if np.ptp(x) > 0 or not name.endswith("_rho")]
+    design = np.stack([columns[name] for name in names], axis=1)
+    solution, *_ = np.linalg.lstsq(design * weights[:, None], y * weights, rcond=None)
+    coefficients = {name : 0.0 for name in columns}
+    coefficients.update({name : float(value) for name, value in zip(names, solution)})
+    return coefficients
+
+
+# ------------------------------------------------------------------
+# Fit the surrogate on Monte Carlo runs
+# ------------------------------------------------------------------
+# Inputs:
+#     - config : ReactorV2 configuration, the rods must move during the runs
+#                for the rods coefficients to be identifiable
+#     - n_runs : number of calibration runs
+#     - seed : root seed of the runs
+# Returns:
+#     - PointKinetics model and the calibration traces
+def fit_point_kinetics(config:dict, n_runs:int=4, seed=0):
+    seeds = np.random.SeedSequence(seed).spawn(n_runs)
+    traces = [record_trace(config, seed_seq) for seed_seq in seeds]
+    groups = np.concatenate([trace.groups[:-1] for trace in traces])
+    next_groups = np.concatenate([trace.groups[1:] for trace in traces])
+    fissions = np.concatenate([trace.fissions[:-1] for trace in traces])
+    rho = np.concatenate([trace.rho[:-1] for trace in traces])
+    if np.count_nonzero(groups[:, 2]) < 2:
+        raise ValueError("Not enough steps with thermal neutrons to fit the surrogate.")
+    fast, epi, thermal = groups.T
+
+    # Counts are sums of Bernoulli draws : their variance grows like the neutrons they
+    # come from. The weights use these neutrons, weights from the fitted counts
+    # themselves would favour the low counts and bias the rates down
+    def weights(*sources):
+        return 1.0 / np.sqrt(np.maximum(sum(sources), 1.0))
+
+    # === 1. Each group from the groups of the previous step ===
+    coefficients = {}
+    coefficients.update(_least_squares({"s_fast" : fast, "nu" : fissions}, next_groups[:, 0], weights(fast, fissions)))
+    coefficients.update(_least_squares({"p_epi" : fast, "s_epi" : epi}, next_groups[:, 1], weights(fast, epi)))
+    coefficients.update(_least_squares({"p_thermal" : epi, "s_thermal" : thermal, "s_rho" : rho * thermal}, next_groups[:, 2], weights(epi, thermal)))
+
+    # === 2. Fissions of the thermal neutrons ===
+    coefficients.update(_least_squares({"yield_0" : thermal, "yield_rho" : rho * thermal}, fissions, weights(thermal)))
+
+    initial_groups = np.mean([trace.groups[0] for trace in traces], axis=0)
+    return PointKinetics(coefficients, traces[0].dt, initial_groups), traces
+
+
+# ------------------------------------------------------------------
+# Compare the surrogate with Monte Carlo traces
+# ------------------------------------------------------------------
+# Inputs:
+#     - model : fitted PointKinetics
+#     - config : ReactorV2 configuration
+#     - traces : Monte Carlo traces (e.g. new seeds with record_trace)
+# Returns:
+#     - dictionary of the comparison metrics, see format_report
+def validation_report(model:PointKinetics, config:dict, traces:list):
+    surrogate, _ = model.simulate(config)
+    report = {
+        "k_eff" : model.k_eff(),
+        "generation_time" : model.generation_time(),
+        "n_runs" : len(traces),
+        "speedup" : np.mean([trace.wall_time for trace in traces]) / max(surrogate.wall_time, 1e-9)
+    }
+    for name in ("power", "temperature"):
+        runs = np.vstack([getattr(trace, name) for trace in traces])
+        mean, std = runs.mean(axis=0), runs.std(axis=0)
+        error = getattr(surrogate, name) - mean
+        report[name] = {
+            "rmse" : float(np.sqrt(np.mean(error**2))),
+            "relative_rmse" : float(np.sqrt(np.mean(error**2)) / max(np.mean(np.abs(mean)), 1e-12)),
+            "max_error" : float(np.max(np.abs(error))),
+            "final_mc" : float(mean[-1]),
+            "final_surrogate" : float(getattr(surrogate, name)[-1]),
+            # Fraction of steps where the surrogate is inside the Monte Carlo 2 sigma band
+            "coverage" : float(np.mean(np.abs(error) <= 2 * std))
+        }
+    return report
+
+
+def format_report(report:dict):
+    lines = [
+        f"k_eff = {report['k_eff']:.4f}   generation time = {report['generation_time']:.4g} s",
+        f"Monte Carlo runs : {report['n_runs']}   speedup : x{report['speedup']:.0f}"
+    ]
+    for name, unit in (("power", "MW"), ("temperature", "K")):
+        r = report[name]
+        lines.append(
+            f"{name:<12} rmse {r['rmse']:.4g} {unit} ({100 * r['relative_rmse']:.1f} %)   max {r['max_error']:.4g} {unit}   "
+            f"final {r['final_mc']:.4g} / {r['final_surrogate']:.4g} {unit}   2 sigma coverage {100 * r['coverage']:.0f} %"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,199 @@
+# ==========================================================================================
+#                                 Parameter Sweep Engine
+# ==========================================================================================
+
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ReactorV2 import ReactorV2
+
+
+# ------------------------------------------------------------------
+# Full factorial design
+# ------------------------------------------------------------------
+# Inputs:
+#     - base_config : ReactorV2 configuration shared by all the points
+#     - grid : dictionary {config key: list of values}
+# Returns:
+#     - list of configurations, one per combination of values
+def expand_grid(base_config:dict, grid:dict):
+    keys = list(grid)
+    return [dict(base_config, **dict(zip(keys, values))) for values in itertools.product(*grid.values())]
+
+
+# ------------------------------------------------------------------
+# Latin hypercube design
+# ------------------------------------------------------------------
+# Inputs:
+#     - base_config : ReactorV2 configuration shared by all the points
+#     - ranges : dictionary {config key: (low, high)} for numeric keys (both bounds
+#                included for integers),
+#                or {config key: [choices]} for categorical keys
+#     - n_points : number of points of the design
+#     - seed : seed of the design
+# Returns:
+#     - list of configurations, each stratum of each key is used exactly once
+def latin_hypercube(base_config:dict, ranges:dict, n_points:int, seed=None):
+    rng = np.random.default_rng(seed)
+    configs = [dict(base_config) for _ in range(n_points)]
+    for key, values in ranges.items():
+        # One point in each of the n_points strata, in a random order
+        u = (rng.permutation(n_points) + rng.random(n_points)) / n_points
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                # high is included : each of the high - low + 1 integers gets an equal share
+                column = np.minimum(low + np.floor(u * (high - low + 1)), high).astype(int).tolist()
+            else:
+                column = (low + u * (high - low)).tolist()
+        else:
+            column = [values[int(v * len(values))] for v in u]
+        for config, value in zip(configs, column):
+            config[key] = value
+    return configs
+
+
+# ------------------------------------------------------------------
+# Canonical hash of a configuration and a seed
+# ------------------------------------------------------------------
+def config_hash(config:dict, seed):
+    canonical = json.dumps({"config" : config, "seed" : seed}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+        On-disk cache of the sweep results, one JSON file per (configuration, seed).
+        Reading an entry refreshes its date, and the least recently used entries are
+        removed when the cache holds more than max_entries results.
+    """
+
+    def __init__(self, folder:str="statistics/sweep_cache", max_entries:int=10000):
+        self.folder = folder
+        self.max_entries = max_entries
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+
+    def path(self, key:str):
+        return os.path.join(self.folder, f"{key}.json")
+
+
+    def get(self, key:str):
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        with open(path) as f:
+            return json.load(f)["result"]
+
+
+    def put(self, key:str, config:dict, seed, result:dict):
+        with open(self.path(key), "w") as f:
+            json.dump({"config" : config, "seed" : seed, "result" : result}, f, default=str)
+
+
+    # ------------------------------------------------------------------
+    # Remove the least recently used entries
+    # ------------------------------------------------------------------
+    def evict(self):
+        entries = [os.path.join(self.folder, f) for f in os.listdir(self.folder) if f.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            os.remove(path)
+
+
+# ------------------------------------------------------------------
+# Run one point of a sweep (one replica of one configuration)
+# ------------------------------------------------------------------
+# Returns:
+#     - dictionary of the metrics only run summary
+def run_point(config:dict, seed_seq):
+    reactor = ReactorV2(None, dict(config, seed=seed_seq, rng=None, display=False, verbose=False, quiet=True, trajectory_export=None))
+    result = reactor.run_metrics()
+    return {
+        "n_steps" : result.n_steps,
+        "stop_reason" : result.stop_reason,
+        "extinction_step" : result.extinction_step,
+        "counts" : result.counts.tolist(),
+        "power_mw" : result.power_history.tolist(),
+        "temperature_k" : result.temp_history.tolist(),
+        "scram_triggered" : result.scram_triggered
+    }
+
+
+# ------------------------------------------------------------------
+# Run a sweep, only the points missing from the cache are simulated
+# ------------------------------------------------------------------
+# Inputs:
+#     - configs : list of configurations (see expand_grid and latin_hypercube)
+#     - n_replicas : number of independent runs of each configuration
+#     - seed : root seed of the sweep
+#     - n_workers : number of processes (None = all the cores, 1 = no pool)
+#     - cache : optional ResultCache
+# Returns:
+#     - list of {"config", "replica", "seed", "key", "result"} records
+def run_sweep(configs:list, n_replicas:int=1, seed:int=0, n_workers=None, cache:ResultCache=None):
+    # === 1. Points of the sweep ===
+    # The seed of a replica only depends on its configuration, so that adding or
+    # removing points does not change the results of the others
+    records = []
+    for config in configs:
+        config_key = int(config_hash(config, None)[:16], 16)
+        for replica in range(n_replicas):
+            point_seed = [seed, config_key, replica]
+            records.append({
+                "config" : config,
+                "replica" : replica,
+                "seed" : point_seed,
+                "key" : config_hash(config, point_seed),
+                "result" : None
+            })
+
+    # === 2. Read the cache ===
+    if cache is not None:
+        for record in records:
+            record["result"] = cache.get(record["key"])
+    todo = [record for record in records if record["result"] is None]
+
+    # === 3. Simulate the missing points ===
+    seeds = [np.random.SeedSequence(record["seed"]) for record in todo]
+    point_configs = [record["config"] for record in todo]
+    if n_workers == 1 or len(todo) <= 1:
+        results = [run_point(config, seed_seq) for config, seed_seq in zip(point_configs, seeds)]
+    else:
+        n_workers = n_workers or os.cpu_count()
+        chunksize = max(1, len(todo) // (4 * n_workers))
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(run_point, point_configs, seeds, chunksize=chunksize))
+
+    for record, result in zip(todo, results):
+        record["result"] = result
+        if cache is not None:
+            cache.put(record["key"], record["config"], record["seed"], result)
+
+    if cache is not None:
+        cache.evict()
+    return records
+
+
+# ------------------------------------------------------------------
+# Mean of a scalar metric over the replicas of each configuration
+# ------------------------------------------------------------------
+# Inputs:
+#     - records : output of run_sweep
+#     - metric : function result -> float, e.g. lambda r: r["extinction_step"] >= 0
+# Returns:
+#     - list of (config, mean) in the order of the sweep
+def summarize(records:list, metric):
+    groups = {}
+    for record in records:
+        key = config_hash(record["config"], None)
+        groups.setdefault(key, (record["config"], []))[1].append(metric(record["result"]))
+    return [(config, float(np.mean(values))) for config, values in groups.values()]
@@ -0,0 +1,95 @@
+# ==========================================================================================
+#                                    Event Channel
+# ==========================================================================================
+
+from collections import deque, namedtuple
+
+LEVELS = {"debug" : 10, "info" : 20, "warning" : 30, "critical" : 40, "off" : 100}
+
+Event = namedtuple("Event", ["step", "level", "kind", "message", "args"])
+
+
+class EventChannel:
+    """
+        Collect the messages of a simulation as structured events instead of printing
+        them in the loop. Events below the channel level are dropped right away, the
+        others are rate limited per kind, kept in a ring buffer and optionally echoed.
+    """
+
+    def __init__(self, level:str="info", echo:bool=True, rate_limit:int=0, buffer_size:int=10000):
+        self.level = LEVELS[level]
+        self.echo = echo                    # Print the recorded events
+        self.rate_limit = rate_limit        # Minimal number of steps between two events of a kind
+        self.buffer = deque(maxlen=buffer_size)
+        self.step = 0
+
+        self.last_step = {}                 # Step of the last recorded event of each kind
+        self.n_recorded = {}
+        self.n_suppressed = {}
+
+
+    def enabled_for(self, level:str):
+        return LEVELS[level] >= self.level
+
+
+    # ------------------------------------------------------------------
+    # Emit an event
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - kind : name of the event, e.g. 'rod.move' or 'protection.runback'
+    #     - message : message with %-style placeholders, only formatted if needed
+    #     - args : values of the placeholders
+    #     - level : 'debug', 'info', 'warning' or 'critical'
+    # Returns:
+    #     - True if the event was recorded
+    def emit(self, kind:str, message:str, *args, level:str="info"):
+        if LEVELS[level] < self.level:
+            return False
+
+        # === 1. Rate limiting by kind ===
+        last = self.last_step.get(kind)
+        if last is not None and self.step - last < self.rate_limit:
+            self.n_suppressed[kind] = self.n_suppressed.get(kind, 0) + 1
+            return False
+        self.last_step[kind] = self.step
+        self.n_recorded[kind] = self.n_recorded.get(kind, 0) + 1
+
+        # === 2. Record and echo ===
+        event = Event(self.step, level, kind, message, args)
+        self.buffer.append(event)
+        if self.echo:
+            print(format_event(event))
+        return True
+
+
+    # ------------------------------------------------------------------
+    # Query the recorded events after the run
+    # ------------------------------------------------------------------
+    # Inputs:
+    #     - kind : keep the events of this kind, or of this family with a trailing '.'
+    #     - level : minimal level of the events
+    #     - since : first step
+    # Returns:
+    #     - list of Event
+    def query(self, kind:str=None, level:str=None, since:int=None):
+        events = []
+        for event in self.buffer:
+            if kind is not None and event.kind != kind and not (kind.endswith(".") and event.kind.startswith(kind)):
+                continue
+            if level is not None and LEVELS[event.level] < LEVELS[level]:
+                continue
+            if since is not None and event.step < since:
+                continue
+            events.append(event)
+        return events
+
+
+    # Number of recorded and suppressed events of each kind
+    def summary(self):
+        kinds = set(self.n_recorded) | set(self.n_suppressed)
+        return {kind : (self.n_recorded.get(kind, 0), self.n_suppressed.get(kind, 0)) for kind in sorted(kinds)}
+
+
+def format_event(event:Event):
+    message = event.message % event.args
+    return f"[{event.step}] {event.level.upper()} {event.kind} : {message}"
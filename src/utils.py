@@ -2,21 +2,49 @@
 #                                 Random & Export Functions
 # ==========================================================================================
 
+import numpy as np 
+
+from history import HistoryStore
+from population import NEUTRON_TYPES
+
 # Poisson random variable generation
 # Input: 
 #     - l : mean of the Poisson distribution
+#     - rng : numpy.random.Generator of the simulation
 # Returns: 
 #     - integer representing a random value from a Poisson-like distribution
-def simul_poisson(l): 
-    import numpy as np 
-    from numpy import random as npr
+def simul_poisson(l, rng): 
     # We take min (5,.) because the fission can produce max 5 neutrons
     # We take max(2,.) beacause the fission cant produce less than 2 neutrons
-    return min(5, max(2, int(np.ceil(-(1/l) * np.log(npr.rand())))))
+    return min(5, max(2, int(np.ceil(-(1/l) * np.log(rng.random())))))
+
+
+# Batched version of simul_poisson for a whole step of fissions
+# Input: 
+#     - l : mean of the Poisson distribution
+#     - size : number of fission events
+#     - rng : numpy.random.Generator of the simulation
+# Returns: 
+#     - integer array of the neutrons produced by each fission, clamped in [2, 5]
+def simul_poisson_batch(l, size:int, rng): 
+    return np.clip(np.ceil(-(1/l) * np.log(rng.random(size))), 2, 5).astype(np.int64)
+
+
+# Distribution of the neutrons produced by fission
+# Input: 
+#     - n_new : array returned by simul_poisson_batch
+# Returns: 
+#     - dictionary {2: count, 3: count, 4: count, 5: count}
+def fission_histogram(n_new, weights=None): 
+    # Weighted neutrons : each fission counts for the weight of its neutron
+    counts = np.bincount(n_new, weights=weights, minlength=6)
+    if weights is not None:
+        return {nb : float(counts[nb]) for nb in range(2, 6)}
+    return {nb : int(counts[nb]) for nb in range(2, 6)}
 
 
 # ---------------------------- CSV Export --------------------------------------------------
-import pandas as pd
+# pandas is imported by the export functions only, the simulation does not need it
 
 def export_data(reactor, config, output_folder="statistics_output"):
     from datetime import datetime
@@ -41,16 +69,24 @@ def export_data(reactor, config, output_folder="statistics_output"):
     history_filename = f"reactor_history_{timestamp}.csv"
     fission_filename = f"fission_stat_{timestamp}.csv"
     neutrons_filename = f"neutrons_trajectories_{timestamp}.csv"
+    profile_filename = f"profile_{timestamp}.csv"
     settings_path = os.path.join(export_simulation_folder, settings_filename)
     history_path = os.path.join(export_simulation_folder, history_filename)
     fission_path = os.path.join(export_simulation_folder, fission_filename)
     neutrons_path = os.path.join(export_simulation_folder, neutrons_filename)
+    profile_path = os.path.join(export_simulation_folder, profile_filename)
 
     # Launch export
     print(f"========== Exporting Data ({timestamp}) ==========")
     export_react_traj(reactor, history_path)
-    export_neutrons_traj(reactor.history, neutrons_path)
+    if reactor.traj_streamer is not None:
+        # Trajectories were already written during the simulation
+        print(f"+ Trajectories streamed to {', '.join(reactor.traj_streamer.files)}")
+    else:
+        export_neutrons_traj(reactor.history, neutrons_path, reactor.history_start)
     export_settings(reactor, config, settings_path)
+    if reactor.profiler is not None:
+        export_profile(reactor.profiler, profile_path)
     print("========== Export Done ==========")
 
 
@@ -58,21 +94,24 @@ def export_data(reactor, config, output_folder="statistics_output"):
 # Export trajectory 
 # -----------------------------------------
 def export_react_traj(reactor, path:str):
+    import pandas as pd
+
     print(f"+ Exporting reactor metrics to {path}")
     
     if not reactor.fission_stat_history:
         print("No fission stats to export.")
         return
     
-    min_len = min(len(reactor.history), len(reactor.power_history), len(reactor.temp_history))
+    # Steps recorded by every history (a checkpoint without counts restarts them)
+    nb_neutrons = reactor.get_population_counts()
+    min_len = min(len(nb_neutrons), len(reactor.power_history), len(reactor.temp_history), len(reactor.fission_stat_history))
 
     # Creating data to export 
     data = {
         "time_step": list(range(min_len)),
-        "nb_neutrons": [len(snap) for snap in reactor.history[:min_len]],
+        "nb_neutrons": nb_neutrons[:min_len],
         "power_mw": reactor.power_history[:min_len],
-        "temperature_k": reactor.temp_history[:min_len],
-        "time_step": list(range(len(reactor.fission_stat_history)))
+        "temperature_k": reactor.temp_history[:min_len]
     }
 
     # Add rod history
@@ -88,7 +127,7 @@ def export_react_traj(reactor, path:str):
     for nb in [2, 3, 4, 5]:
         data[f"fissions_prod_{nb}"] = []
 
-    for step_stats in reactor.fission_stat_history:
+    for step_stats in reactor.fission_stat_history[:min_len]:
         for nb in [2, 3, 4, 5]:
             count = step_stats.get(nb, 0)
             data[f"fissions_prod_{nb}"].append(count)
@@ -102,15 +141,26 @@ def export_react_traj(reactor, path:str):
 # -----------------------------------------------
 # Export neutron trajectory 
 # -----------------------------------------------
-def export_neutrons_traj(history, path:str): 
+# first_step : time step of the first snapshot of a dict history (resumed runs)
+def export_neutrons_traj(history, path:str, first_step:int=0): 
     import csv
 
     print(f"+ Exporting detailed trajectories to {path}")
     with open(path, "w", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=["time_step", "neutron_id", "x", "y", "type"])
         writer.writeheader()
+
+        # Columnar history : rows are written chunk by chunk from the arrays
+        if isinstance(history, HistoryStore):
+            rows = csv.writer(f)
+            for steps, ids, xs, ys, types in history.iter_chunks():
+                rows.writerows(zip(
+                    steps.tolist(), ids.tolist(), xs.tolist(), ys.tolist(), NEUTRON_TYPES[types].tolist()
+                ))
+            print("+ Done.")
+            return
         
-        for t, snapshot in enumerate(history):
+        for t, snapshot in enumerate(history, start=first_step):
             for neutron_id, (x, y, neutron_type) in snapshot.items():
                 writer.writerow({
                     "time_step": t,
@@ -126,6 +176,8 @@ def export_neutrons_traj(history, path:str):
 # Export settings
 # -----------------------------------------------
 def export_settings(reactor, config:dict, path:str):
+    import pandas as pd
+
     print(f"+ Exporting simulation settings to {path}")
 
     all_data = config.copy()
@@ -158,4 +210,15 @@ def export_settings(reactor, config:dict, path:str):
     df.index.name = 'parameter'
 
     df.to_csv(path, encoding='utf-8')
-    print("+ Done.")
\ No newline at end of file
+    print("+ Done.")
+
+
+# -----------------------------------------------
+# Export the per phase profile (see profiling.PhaseProfiler)
+# -----------------------------------------------
+def export_profile(profiler, path:str):
+    import pandas as pd
+
+    print(f"+ Exporting phase profile to {path}")
+    pd.DataFrame(profiler.columns()).to_csv(path, index=False)
+    print("+ Done.")
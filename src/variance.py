@@ -0,0 +1,95 @@
+# ==========================================================================================
+#                          Weighted Neutrons and Population Control
+# ==========================================================================================
+
+import numpy as np
+
+
+# ------------------------------------------------------------------
+# Implicit capture : absorption lowers the weight instead of killing
+# ------------------------------------------------------------------
+# Inputs:
+#     - thresholds : (size, 2) array of (diffusion, absorption) cumulated probabilities
+#                    (see sampling.ActionSampler.actions_at)
+# Returns:
+#     - survival : probability of not being absorbed, the weights are multiplied by it
+#     - thresholds : same format, conditioned on the survival (absorption never drawn)
+def implicit_capture(thresholds):
+    p_diffuse = thresholds[:, 0]
+    survival = 1.0 - (np.minimum(thresholds[:, 1], 1.0) - p_diffuse)
+    # Fully absorbing cells : the neutron diffuses with a null weight, the roulette removes it
+    diffuse = np.divide(p_diffuse, survival, out=np.ones_like(p_diffuse), where=survival > 0)
+    return survival, np.stack((diffuse, diffuse), axis=1)
+
+
+# ------------------------------------------------------------------
+# Replace the population by the selected neutrons, copies get new ids
+# ------------------------------------------------------------------
+# Inputs:
+#     - index : sorted indices of the kept neutrons, repeated for the copies
+#     - weights : weight of each kept neutron
+#     - next_id : first free neutron id
+# Returns:
+#     - next_id : next free neutron id
+def resample(pop, index, weights, next_id:int):
+    pop.keep(index)
+    pop.weight = np.asarray(weights, dtype=np.float64)
+    copies = np.flatnonzero(index[1:] == index[:-1]) + 1
+    pop.id[copies] = np.arange(next_id, next_id + len(copies))
+    return next_id + len(copies)
+
+
+# ------------------------------------------------------------------
+# Weight window : Russian roulette of the light neutrons, splitting of the heavy ones
+# ------------------------------------------------------------------
+# Inputs:
+#     - pop : population.NeutronPopulation
+#     - rng : numpy.random.Generator
+#     - next_id : first free neutron id
+#     - w_ref : reference weight, the window bounds are relative to it
+#     - low, survive, high : roulette below low * w_ref (survivors get survive * w_ref),
+#                            splitting above high * w_ref
+# Returns:
+#     - next_id : next free neutron id
+def weight_window(pop, rng, next_id:int, w_ref:float=1.0, low:float=0.25, survive:float=1.0, high:float=4.0):
+    w = pop.weight / w_ref
+    light = w < low
+    heavy = w > high
+    if not light.any() and not heavy.any():
+        return next_id
+
+    # === 1. Russian roulette, unbiased : survival probability w / survive ===
+    n_copies = np.ones(len(pop), dtype=np.int64)
+    survived = rng.random(int(light.sum())) * survive < w[light]
+    n_copies[light] = survived
+    w[light] = survive
+
+    # === 2. Splitting in copies lighter than the upper bound ===
+    n_copies[heavy] = np.ceil(w[heavy] / high).astype(np.int64)
+    w = w / np.maximum(n_copies, 1)
+
+    index = np.repeat(np.arange(len(pop)), n_copies)
+    return resample(pop, index, w[index] * w_ref, next_id)
+
+
+# ------------------------------------------------------------------
+# Comb : systematic resampling of the population to a target size
+# ------------------------------------------------------------------
+# The total weight is kept exactly, every selected neutron gets the same weight
+# Inputs:
+#     - pop : population.NeutronPopulation
+#     - target : number of neutrons after the comb
+#     - rng : numpy.random.Generator
+#     - next_id : first free neutron id
+# Returns:
+#     - next_id : next free neutron id
+#     - weight of the neutrons after the comb (0 for an empty population)
+def comb(pop, target:int, rng, next_id:int):
+    total = float(pop.weight.sum())
+    if len(pop) == 0 or total <= 0.0:
+        return next_id, 0.0
+    spacing = total / target
+    teeth = (rng.random() + np.arange(target)) * spacing
+    index = np.searchsorted(np.cumsum(pop.weight), teeth, side='right')
+    index = np.minimum(index, len(pop) - 1)     # Rounding of the last cumulated weight
+    return resample(pop, index, np.full(target, spacing), next_id), spacing
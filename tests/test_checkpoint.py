@@ -0,0 +1,120 @@
+# ==========================================================================================
+#                              Checkpoint Resume and Export
+# ==========================================================================================
+
+import contextlib
+import glob
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from ReactorV2 import ReactorV2
+from checkpoint import resume
+from utils import export_data
+
+
+def make_config(**overrides):
+    config = {
+        'n_iter' : 20, 'n_initial' : 100, 'a' : 0.1, 'f' : 0.6, 'd' : 0.5, 'l' : 3,
+        'n' : 15, 'm' : 15, 'thermic_capacity' : 1e7, 'toric' : False,
+        'moderator' : 'heavy_water', 'initial_distribution' : 'uniform',
+        'max_speed' : 2, 'thermalization_probs' : {'fast_to_epi': 0.5, 'epi_to_thermal': 0.5},
+        'display' : False, 'colorized' : True, 'verbose' : False, 'quiet' : True,
+        'rod_active' : True, 'scram_threshold' : 2, 'seed' : 2,
+        'control_rods' : [{'id': 'RE01', 'type': 'regulation'}, {'id': 'SC01', 'type': 'scram'}]
+    }
+    config.update(overrides)
+    return config
+
+
+def read_export(reactor, folder):
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_data(reactor, reactor.config, folder)
+    history_files = glob.glob(os.path.join("statistics", folder, "*", "reactor_history_*.csv"))
+    traj_files = glob.glob(os.path.join("statistics", folder, "*", "neutrons_trajectories_*.csv"))
+    with open(history_files[0]) as f:
+        history = f.read()
+    with open(traj_files[0]) as f:
+        first_step = int(f.readlines()[1].split(",")[0])
+    return history, first_step
+
+
+# A resumed run exports the same metrics as the uninterrupted run
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+@pytest.mark.parametrize("history", ["dict", "columnar"])
+def test_resume_then_export(tmp_path, monkeypatch, engine, history):
+    monkeypatch.chdir(tmp_path)
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    ReactorV2(None, make_config(engine=engine, history=history, checkpoint_every=10, checkpoint_path=checkpoint)).simulate()
+
+    resumed = resume(checkpoint, config_overrides={'n_iter' : 30, 'checkpoint_every' : 0})
+    full = ReactorV2(None, make_config(engine=engine, history=history, n_iter=30))
+    full.simulate()
+
+    resumed_history, resumed_first_step = read_export(resumed, "resumed")
+    full_history, _ = read_export(full, "full")
+    assert resumed_history == full_history
+    # The snapshots of the resumed run start at the restart step
+    assert resumed_first_step == 20
+
+
+def read_stream(prefix, format):
+    from stream_export import load_npz_shards
+
+    if format == "npz":
+        columns = load_npz_shards(prefix)
+        return sorted(zip(*(columns[name].tolist() for name in ("time_step", "neutron_id", "x", "y"))))
+    with open(prefix + ".csv") as f:
+        rows = [line.strip().split(",") for line in f.readlines()[1:]]
+    return sorted(tuple(int(v) for v in row[:4]) for row in rows)
+
+
+# The streamed trajectories of a resumed run continue the files of the interrupted run
+@pytest.mark.parametrize("format", ["npz", "csv"])
+def test_resume_streamed_trajectories(tmp_path, format):
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    resumed_prefix, full_prefix = str(tmp_path / "resumed" / "traj"), str(tmp_path / "full" / "traj")
+    export = {'path' : resumed_prefix, 'format' : format, 'chunk_rows' : 500}
+    # The run goes on after its checkpoint, these steps are written again by the resumed run
+    ReactorV2(None, make_config(trajectory_export=export, checkpoint_every=10, checkpoint_path=checkpoint)).simulate()
+
+    resume(checkpoint, config_overrides={'n_iter' : 30, 'checkpoint_every' : 0})
+    full = ReactorV2(None, make_config(n_iter=30, trajectory_export=dict(export, path=full_prefix)))
+    full.simulate()
+    assert read_stream(resumed_prefix, format) == read_stream(full_prefix, format)
+
+
+def test_resume_parquet_export_is_refused(tmp_path):
+    pytest.importorskip("pyarrow")
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    export = {'path' : str(tmp_path / "traj"), 'format' : 'parquet', 'chunk_rows' : 500}
+    ReactorV2(None, make_config(trajectory_export=export, checkpoint_every=10, checkpoint_path=checkpoint)).simulate()
+    with pytest.raises(ValueError, match="parquet"):
+        resume(checkpoint, config_overrides={'n_iter' : 30})
+
+
+# Nothing was written before the checkpoint : every shard of the interrupted run is stale
+def test_restore_without_chunks_removes_stale_shards(tmp_path):
+    from stream_export import TrajectoryStreamer
+
+    prefix = str(tmp_path / "traj")
+    interrupted = TrajectoryStreamer(prefix, "npz", chunk_rows=1, background=False)
+    state = interrupted.sync()
+    interrupted.write(0, [0], [1], [2], [0])
+    interrupted.close()
+    assert glob.glob(prefix + "_*.npz")
+
+    TrajectoryStreamer(prefix, "npz", background=False).restore(state)
+    assert glob.glob(prefix + "_*.npz") == []
+
+
+def test_resume_keeps_the_random_block_size(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    ReactorV2(None, make_config(random_block_size=4096, checkpoint_every=10, checkpoint_path=checkpoint)).simulate()
+    with pytest.raises(ValueError, match="random block size"):
+        resume(checkpoint, config_overrides={'random_block_size' : 1024})
+    assert ReactorV2.from_checkpoint(checkpoint).sampler.block.block_size == 4096
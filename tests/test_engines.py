@@ -0,0 +1,64 @@
+# ==========================================================================================
+#                          Object and Vectorized Engines Parity
+# ==========================================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from ReactorV2 import ReactorV2
+from test_checkpoint import make_config
+
+N_RUNS = 150
+
+
+# Histories of a run : neutrons, power, temperature and fissions of each size
+def run_histories(engine, seed, **overrides):
+    reactor = ReactorV2(None, make_config(engine=engine, seed=seed, **overrides))
+    reactor.simulate()
+    fissions = [[stats.get(size, 0) for size in range(2, 6)] for stats in reactor.fission_stat_history]
+    return {
+        "counts" : np.array(reactor.get_population_counts(), dtype=np.float64),
+        "power" : np.array(reactor.power_history),
+        "temperature" : np.array(reactor.temp_history),
+        "fissions" : np.array(fissions, dtype=np.float64)
+    }
+
+
+# Difference of the means of two samples, in standard errors
+def z_score(a, b):
+    error = np.sqrt(a.var(axis=0, ddof=1) / len(a) + b.var(axis=0, ddof=1) / len(b))
+    return np.abs(a.mean(axis=0) - b.mean(axis=0)) / np.where(error > 0, error, 1.0)
+
+
+# The vectorized engine follows the same rules as the object one : over seeded
+# replicas, the histories of both engines have the same means
+def test_vectorized_engine_reproduces_the_histories():
+    runs = {
+        engine : [run_histories(engine, 1000 + seed, n_iter=30) for seed in range(N_RUNS)]
+        for engine in ("object", "vectorized")
+    }
+    for name in ("counts", "power", "temperature", "fissions"):
+        by_engine = [np.array([run[name] for run in runs[engine]]) for engine in ("object", "vectorized")]
+        assert by_engine[0].shape == by_engine[1].shape
+        # Whole run, then every step (wider band for the many steps compared)
+        assert z_score(*(values.sum(axis=1) for values in by_engine)).max() < 4, name
+        assert z_score(*by_engine).max() < 5, name
+
+
+# A seed gives the same run again, bit for bit, with the same engine
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_same_seed_same_run(engine):
+    first, second = (ReactorV2(None, make_config(engine=engine, seed=7)) for _ in range(2))
+    first.simulate()
+    second.simulate()
+    assert first.get_population_counts() == second.get_population_counts()
+    assert first.power_history == second.power_history
+    assert first.temp_history == second.temp_history
+    assert first.fission_stat_history == second.fission_stat_history
+    assert first.rod_history == second.rod_history
+    assert first.get_snapshot() == second.get_snapshot()
@@ -0,0 +1,87 @@
+# ==========================================================================================
+#                                 Columnar History Store
+# ==========================================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from history import HistoryStore, population_counts
+from population import NEUTRON_TYPES
+
+
+# Appends random snapshots (every 7th step is empty) and returns them
+def fill(history, n_steps, size, rng):
+    snapshots = []
+    for step in range(n_steps):
+        n = size if step % 7 else 0
+        snapshot = (rng.integers(0, 10**6, n), rng.integers(0, 100, n), rng.integers(0, 100, n), rng.integers(0, 3, n))
+        history.append(*snapshot)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+# Snapshots and columns read back what was appended, from full chunks and pending rows
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("stride", [1, 3])
+def test_round_trip(compress, stride):
+    rng = np.random.default_rng(0)
+    history = HistoryStore(stride=stride, compress=compress, chunk_rows=500)
+    snapshots = fill(history, 50, 70, rng)
+    kept = snapshots[::stride]
+    assert history.chunks and history.pending_rows > 0
+    assert history.steps == list(range(0, 50, stride))
+    assert history.get_counts().tolist() == [len(snapshot[0]) for snapshot in snapshots]
+    assert population_counts(history) == history.get_counts().tolist()
+
+    for k, snapshot in enumerate(kept):
+        for stored, appended in zip(history.snapshot(k), snapshot):
+            assert np.array_equal(stored, appended)
+    assert all(np.array_equal(a, b) for a, b in zip(history.snapshot(-1), kept[-1]))
+
+    steps, *columns = history.columns()
+    assert np.array_equal(steps, np.repeat(history.steps, [len(snapshot[0]) for snapshot in kept]))
+    for stored, appended in zip(columns, zip(*kept)):
+        assert np.array_equal(stored, np.concatenate(appended))
+
+    # Rows across several chunks and the pending ones
+    ids = columns[0]
+    for start, stop in ((0, len(ids)), (30, 1234), (len(ids) - 100, len(ids))):
+        assert np.array_equal(history._rows(start, stop)[0], ids[start:stop])
+
+
+# Flushing does not change what is read
+def test_flush_keeps_the_rows():
+    rng = np.random.default_rng(1)
+    history = HistoryStore(compress=True, chunk_rows=10**6)
+    snapshots = fill(history, 10, 20, rng)
+    before = history.columns()
+    history.flush()
+    assert history.pending_rows == 0 and len(history.chunks) == 1
+    assert all(np.array_equal(a, b) for a, b in zip(before, history.columns()))
+    assert all(np.array_equal(a, b) for a, b in zip(history.snapshot(3), snapshots[3]))
+
+
+# Old dictionary format and trajectories of a neutron
+def test_snapshot_dict_and_trajectories():
+    history = HistoryStore(chunk_rows=3)
+    history.append([1, 2], [0, 1], [5, 6], [0, 1])
+    history.append([2], [2], [7], [2])
+    history.append([], [], [], [])
+    assert history[0] == {1 : (0, 5, NEUTRON_TYPES[0]), 2 : (1, 6, NEUTRON_TYPES[1])}
+    assert history[2] == {}
+    xs, ys = history.trajectories([2])[2]
+    assert xs.tolist() == [1, 2] and ys.tolist() == [6, 7]
+
+
+# Stride 0 only keeps the counts
+def test_counts_only():
+    history = HistoryStore(stride=0)
+    history.append([1, 2], [0, 1], [5, 6], [0, 1])
+    assert len(history) == 0
+    assert history.get_counts().tolist() == [2]
+    assert all(len(column) == 0 for column in history.columns())
@@ -0,0 +1,93 @@
+# ==========================================================================================
+#                                 k-effective Estimator
+# ==========================================================================================
+
+import copy
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from keff import KeffEstimator
+
+
+# Births of a run, generation by generation : the generation g is closed once its
+# children of generation g + 1 are alone alive
+def run_generations(estimator, births, first:int=0):
+    for g, born in enumerate(births, start=first):
+        estimator.record_births(np.full(born, g, dtype=np.int64))
+        estimator.update(np.full(born, g, dtype=np.int64))
+
+
+# A generation is final only when none of its neutrons is alive
+def test_generations_close_when_their_neutrons_are_dead():
+    estimator = KeffEstimator(n_inactive=0)
+    estimator.record_births(np.zeros(100, dtype=np.int64))
+    estimator.record_births(np.ones(150, dtype=np.int64))
+    estimator.update(np.array([0, 1, 1]))
+    assert estimator.k_generations == []
+    estimator.update(np.array([1, 1]))
+    assert estimator.k_generations == [1.5]
+    assert estimator.k_batches == [1.5]
+
+
+# Inactive generations are discarded, the active ones are grouped by batches
+def test_inactive_generations_and_batches():
+    estimator = KeffEstimator(n_inactive=2, batch_size=2)
+    run_generations(estimator, [100, 300, 150, 300, 600, 300, 300])
+    assert estimator.k_generations == [3.0, 0.5, 2.0, 2.0, 0.5, 1.0]
+    # Batches (300 + 600 children of 150 + 300 parents) then (300 + 300 of 600 + 300)
+    assert estimator.k_batches == [2.0, 2.0 / 3.0]
+    assert np.isclose(estimator.mean(), 4.0 / 3.0)
+
+
+# Weighted births count their weights instead of the neutrons
+def test_weighted_births():
+    estimator = KeffEstimator(n_inactive=0)
+    estimator.record_births(np.zeros(4, dtype=np.int64), weights=np.full(4, 0.5))
+    estimator.record_births(np.ones(2, dtype=np.int64), weights=np.full(2, 1.5))
+    estimator.update(np.ones(2, dtype=np.int64))
+    assert estimator.k_generations == [1.5]
+
+
+# A critical chain converges to k = 1 within the tolerance, the running statistics
+# end on the final mean and standard error
+def test_convergence_of_a_critical_chain():
+    rng = np.random.default_rng(3)
+    births = [1000]
+    for _ in range(60):
+        births.append(int(rng.poisson(births[-1])))
+    estimator = KeffEstimator(n_inactive=5, tolerance=0.01, min_active=10)
+    assert not estimator.converged()
+    run_generations(estimator, births)
+    assert len(estimator.k_batches) == 55
+    assert estimator.converged()
+    assert abs(estimator.mean() - 1.0) < 4 * estimator.std_error()
+    means, errors = estimator.running()
+    assert np.isclose(means[-1], estimator.mean())
+    assert np.isclose(errors[-1], estimator.std_error())
+    assert errors[0] == np.inf
+
+
+# Too few active batches never converge, whatever the tolerance
+def test_no_convergence_without_enough_batches():
+    estimator = KeffEstimator(n_inactive=0, tolerance=1.0, min_active=10)
+    run_generations(estimator, [100] * 7)
+    assert len(estimator.k_batches) == 6
+    assert not estimator.converged()
+    assert not KeffEstimator().converged()
+
+
+# A restored estimator continues as the original one
+def test_state_and_restore():
+    births = [100, 120, 90, 110, 100, 95, 105, 100]
+    original = KeffEstimator(n_inactive=1, batch_size=2)
+    run_generations(original, births[:4])
+    restored = KeffEstimator(n_inactive=1, batch_size=2)
+    restored.restore(copy.deepcopy(original.state()))
+    run_generations(original, births[4:], first=4)
+    run_generations(restored, births[4:], first=4)
+    assert restored.state() == original.state()
+    assert len(restored.k_batches) == 3
@@ -0,0 +1,75 @@
+# ==========================================================================================
+#                                      Material Map
+# ==========================================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from materials import MODERATORS, Moderator, load_material_map
+
+MAPS = os.path.join(os.path.dirname(__file__), "..", "src", "maps")
+BARE = Moderator("none", 0.5, 1.0, 0.7, 0.1, 0.2)
+
+
+# Material map file written in the test directory
+def write_map(tmp_path, text):
+    path = tmp_path / "map.txt"
+    path.write_text(text)
+    return str(path)
+
+
+# The reflected core : fuel inside, a reflector without fission around, bare corners
+# and the regulation rod on the center only
+def test_reflected_core():
+    materials = load_material_map(os.path.join(MAPS, "reflected_core.txt"), 15, 15, BARE)
+    assert materials.rod_ids == ["RE01"]
+    assert not materials.uniform
+
+    fuel, reflector = materials.moderator_at(7, 7), materials.moderator_at(0, 7)
+    assert (fuel.name, fuel.absorb_coeff, fuel.fission_coeff) == ("fuel", 0.3, 1.0)
+    assert (reflector.name, reflector.fission_coeff) == ("reflector", 0.0)
+    assert materials.moderator_at(0, 0) is None
+    assert materials.moderator_at(2, 2) is fuel
+
+    # The rod zones differ from the rest of the fuel, outside positions are clipped
+    assert materials.zone_at(7, 7) != materials.zone_at(2, 2)
+    assert materials.zone_at(-3, 7) == materials.zone_at(0, 7)
+    assert np.all(materials.zone_f[materials.zone_rods[:, 0] > 0] == 1.0)
+
+    # Inserting the rod only lowers the fission of the center
+    table = materials.action_table({"RE01" : -1000.0})
+    free = materials.action_table({"RE01" : 0.0})
+    center, edge = materials.zone_at(7, 7), materials.zone_at(2, 2)
+    assert table[1, center, 1] > free[1, center, 1]
+    assert table[1, edge, 1] == free[1, edge, 1]
+
+
+# Materials without coefficients come from MODERATORS, 'none' is the bare material,
+# a rod listed on several lines acts on every region
+def test_named_materials_and_rod_regions(tmp_path):
+    path = write_map(tmp_path, "[materials]\nW heavy_water\n. none\n[rods]\nSC01 0 0 0 0\nSC01 2 2 2 2\n"
+                               "[grid]\nW W .\nW . W  # comment\n. W W\n")
+    materials = load_material_map(path, 3, 3, BARE)
+    assert materials.moderator_at(0, 0) is MODERATORS["heavy_water"]
+    assert materials.moderator_at(0, 2) is None
+    assert materials.zone_at(0, 0) == materials.zone_at(2, 2) != materials.zone_at(1, 0)
+    assert materials.zone_rods[materials.zone_at(2, 2), 0] == 1.0
+    assert materials.ages[materials.zone_at(0, 2)]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("[fuel]\n", "Unknown section"),
+    ("F fuel\n[materials]\n", "Line outside a section"),
+    ("[materials]\nF fuel\n[grid]\nF\n", "needs its coefficients"),
+    ("[materials]\nW graphite\n[grid]\nW W\n", "must have 2 rows of 2 cells"),
+    ("[materials]\nW graphite\n[grid]\nW W\nW\n", "must have 2 rows of 2 cells"),
+    ("[materials]\nW graphite\n[grid]\nW X\nY W\n", "Unknown material symbols in .*: X, Y"),
+])
+def test_errors(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        load_material_map(write_map(tmp_path, text), 2, 2, BARE)
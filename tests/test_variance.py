@@ -0,0 +1,75 @@
+# ==========================================================================================
+#                          Weighted Neutrons and Population Control
+# ==========================================================================================
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from population import NeutronPopulation
+from variance import comb, implicit_capture, weight_window
+
+
+# Population of random weights, from very light to very heavy
+def make_population(size, rng):
+    weights = rng.lognormal(0.0, 1.5, size)
+    return NeutronPopulation(np.arange(size), rng.integers(0, 10, size), rng.integers(0, 10, size),
+                             rng.integers(0, 3, size), weights=weights)
+
+
+# The comb keeps the total weight exactly, with new ids for the copies
+def test_comb_conserves_weight():
+    rng = np.random.default_rng(0)
+    for target in (1, 50, 300, 1000):
+        pop = make_population(300, rng)
+        total = pop.weight.sum()
+        next_id, weight = comb(pop, target, rng, 300)
+        assert len(pop) == target
+        assert np.allclose(pop.weight, weight)
+        assert np.isclose(pop.weight.sum(), total)
+        assert len(np.unique(pop.id)) == target
+        assert next_id == 300 + np.sum(pop.id >= 300)
+
+
+# An empty (or weightless) population is left as it is
+def test_comb_of_empty_population():
+    rng = np.random.default_rng(0)
+    pop = make_population(0, rng)
+    assert comb(pop, 10, rng, 5) == (5, 0.0)
+    assert len(pop) == 0
+
+
+# Splitting conserves the weight exactly, the roulette in expectation
+def test_weight_window_conserves_weight():
+    rng = np.random.default_rng(1)
+    pop = make_population(400, rng)
+    heavy = pop.weight.copy()
+    heavy[heavy <= 4.0] = 2.0
+    pop.weight = heavy
+    total = pop.weight.sum()
+    next_id = weight_window(pop, rng, 400)
+    assert np.isclose(pop.weight.sum(), total)
+    assert pop.weight.max() <= 4.0
+    assert len(np.unique(pop.id)) == len(pop)
+    assert next_id == 400 + np.sum(pop.id >= 400)
+
+    difference = []
+    for _ in range(2000):
+        pop = make_population(200, rng)
+        before = pop.weight.sum()
+        weight_window(pop, rng, 200)
+        difference.append(pop.weight.sum() - before)
+    difference = np.array(difference)
+    assert np.abs(difference.mean()) < 4 * difference.std(ddof=1) / np.sqrt(len(difference))
+
+
+# The survival removes the absorption, the conditioned thresholds never absorb
+def test_implicit_capture():
+    thresholds = np.array([[0.2, 0.6], [0.5, 0.5], [0.0, 1.0], [0.3, 1.2]])
+    survival, conditioned = implicit_capture(thresholds)
+    assert np.allclose(survival, [0.6, 1.0, 0.0, 0.3])
+    assert np.allclose(conditioned[:, 0], conditioned[:, 1])
+    assert np.allclose(conditioned[:, 0], [0.2 / 0.6, 0.5, 1.0, 1.0])